@@ -1,28 +1,36 @@
 #!/usr/bin/env python3
 import sqlite3
 
+# Read-only session; the listing walks idx_med_cat_name_covering in order
+# (database_schema.sql). query_only is used rather than a mode=ro URI because
+# a read-only open cannot attach to a WAL database whose -wal/-shm files are gone.
 conn = sqlite3.connect('blue_pharma_v2.db')
 cursor = conn.cursor()
+cursor.execute('PRAGMA mmap_size=268435456')
+cursor.execute('PRAGMA temp_store=MEMORY')
+cursor.execute('PRAGMA query_only=ON')
 
 print('=== CURRENT MEDICINES IN DATABASE ===')
 cursor.execute('SELECT name, therapeutic_category, price, stock_quantity FROM medicines WHERE is_active = 1 ORDER BY therapeutic_category, name')
-medicines = cursor.fetchall()
 
+# Stream rows straight from the cursor; categories are collected on the way
+categories = {}
+total_medicines = 0
 current_category = None
-for medicine in medicines:
-    name, category, price, stock = medicine
+for name, category, price, stock in cursor:
     if category != current_category:
         print(f'\n📂 {category if category else "Uncategorized"}:')
         current_category = category
+        if category is not None:
+            categories[category] = None
     print(f'  • {name} - {price} ETB (Stock: {stock})')
+    total_medicines += 1
 
-print(f'\n📊 Total medicines: {len(medicines)}')
+print(f'\n📊 Total medicines: {total_medicines}')
 
 print('\n=== CATEGORIES ===')
-cursor.execute('SELECT DISTINCT therapeutic_category FROM medicines WHERE is_active = 1 AND therapeutic_category IS NOT NULL ORDER BY therapeutic_category')
-categories = cursor.fetchall()
 for cat in categories:
-    print(f'  • {cat[0]}')
+    print(f'  • {cat}')
 
 print(f'\n📊 Total categories: {len(categories)}')
 
@@ -1,38 +1,116 @@
 # -*- coding: utf-8 -*-
 from database.db_init import DatabaseManager
+import json
+import os
 import sqlite3
 
+# Use APSW's direct SQLite bindings when installed, otherwise stdlib sqlite3
+try:
+    import apsw
+    APSW_SUPPORT = True
+except ImportError:
+    APSW_SUPPORT = False
+
+# Kept next to this script so the cache does not depend on the working directory
+SCHEMA_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.schema_cache.json')
+
+# Column line of the schema report, formatted from a mapping of fields
+COLUMN_LINE = '{name:<20} {type:<15} {nn:<8} {pk:<3}'.format_map
+
+def load_cached_report(db_path, schema_version):
+    """Return the cached schema report if it matches this database version"""
+    try:
+        with open(SCHEMA_CACHE_FILE, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cache, dict):
+        return None
+    if cache.get('db_path') == db_path and cache.get('schema_version') == schema_version:
+        return cache.get('report')
+    return None
+
+def save_cached_report(db_path, schema_version, report):
+    """Store the rendered schema report keyed by PRAGMA schema_version"""
+    try:
+        with open(SCHEMA_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'db_path': db_path, 'schema_version': schema_version, 'report': report}, f)
+    except OSError:
+        pass
+
+def _row_as_dict(cursor, row):
+    """APSW row tracer giving rows name-based access like sqlite3.Row"""
+    return dict(zip((d[0] for d in cursor.getdescription()), row))
+
+def open_schema_connection(db):
+    """Open a connection and cursor whose rows can be read by column name"""
+    if APSW_SUPPORT:
+        conn = apsw.Connection(db.db_path)
+        cursor = conn.cursor()
+        cursor.row_trace = _row_as_dict
+    else:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+    return conn, cursor
+
 def check_database_schema():
     db = DatabaseManager()
-    conn = db.get_connection()
-    cursor = conn.cursor()
+    conn, cursor = open_schema_connection(db)
+    cursor.execute('PRAGMA mmap_size=268435456')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA query_only=ON')
 
-    print('=== CURRENT DATABASE SCHEMA ===')
-    cursor.execute('SELECT name FROM sqlite_master WHERE type="table"')
-    tables = cursor.fetchall()
+    db_path = os.path.abspath(db.db_path)
+    schema_version = cursor.execute('PRAGMA schema_version').fetchone()['schema_version']
+    report = load_cached_report(db_path, schema_version)
+    if report is not None:
+        print(report)
+        conn.close()
+        return
 
-    for (table_name,) in tables:
-        print(f'\n--- Table: {table_name} ---')
-        cursor.execute(f'PRAGMA table_info({table_name})')
-        columns = cursor.fetchall()
-        for col in columns:
-            print(f'{col[1]:<20} {col[2]:<15} {"NOT NULL" if col[3] else "NULL":<8} {"PK" if col[5] else "":<3}')
+    lines = ['=== CURRENT DATABASE SCHEMA ===']
+    cursor.execute('''
+        SELECT m.name AS table_name, p.name AS name, p.type AS type, p."notnull" AS "notnull", p.pk AS pk
+        FROM sqlite_master m JOIN pragma_table_info(m.name) p
+        WHERE m.type = 'table'
+        ORDER BY m.rowid, p.cid
+    ''')
+    current_table = None
+    for col in cursor:
+        if col['table_name'] != current_table:
+            current_table = col['table_name']
+            lines.append(f'\n--- Table: {current_table} ---')
+        lines.append(COLUMN_LINE({
+            'name': col['name'],
+            'type': col['type'],
+            'nn': 'NOT NULL' if col['notnull'] else 'NULL',
+            'pk': 'PK' if col['pk'] else '',
+        }))
 
-    print('\n=== INDEXES ===')
+    lines.append('\n=== INDEXES ===')
     cursor.execute('SELECT name, tbl_name, sql FROM sqlite_master WHERE type="index" AND sql IS NOT NULL')
-    indexes = cursor.fetchall()
-    for idx in indexes:
-        print(f'{idx[0]} on {idx[1]}:')
-        print(f'  {idx[2]}')
-
-    print('\n=== FOREIGN KEYS ===')
-    for (table_name,) in tables:
-        cursor.execute(f'PRAGMA foreign_key_list({table_name})')
-        fks = cursor.fetchall()
-        if fks:
-            print(f'{table_name}:')
-            for fk in fks:
-                print(f'  {fk[3]} -> {fk[2]}.{fk[4]}')
+    for idx in cursor:
+        lines.append(f'{idx["name"]} on {idx["tbl_name"]}:')
+        lines.append(f'  {idx["sql"]}')
+
+    lines.append('\n=== FOREIGN KEYS ===')
+    cursor.execute('''
+        SELECT m.name AS table_name, f."from" AS from_col, f."table" AS ref_table, f."to" AS to_col
+        FROM sqlite_master m JOIN pragma_foreign_key_list(m.name) f
+        WHERE m.type = 'table'
+        ORDER BY m.rowid, f.id, f.seq
+    ''')
+    current_table = None
+    for fk in cursor:
+        if fk['table_name'] != current_table:
+            current_table = fk['table_name']
+            lines.append(f'{current_table}:')
+        lines.append(f'  {fk["from_col"]} -> {fk["ref_table"]}.{fk["to_col"]}')
+
+    report = '\n'.join(lines)
+    print(report)
+    save_cached_report(db_path, schema_version, report)
 
     conn.close()
 
@@ -8,21 +8,54 @@ This script removes ONLY order-related data from the database:
 - Leaves all other data intact (users, medicines, etc.)
 """
 
+import atexit
 import sqlite3
 import logging
+import sys
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Connections shared between the cleanup and verification steps
+_connections = {}
+
+def _get_conn(db_path):
+    """Return a shared connection for db_path, opening it on first use."""
+    conn = _connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        _connections[db_path] = conn
+    return conn
+
+@atexit.register
+def _close_connections():
+    """Close every shared connection when the interpreter exits."""
+    while _connections:
+        _, conn = _connections.popitem()
+        conn.close()
+
 def clear_order_history(db_path="blue_pharma_v2.db"):
-    """Clear only order history from the database."""
+    """Clear only order history from the database.
+    
+    Returns the open connection on success so callers can keep using it,
+    or False if the cleanup failed.
+    """
     
+    previous_journal_mode = None
     try:
         # Connect to database
-        conn = sqlite3.connect(db_path)
+        conn = _get_conn(db_path)
         cursor = conn.cursor()
         
+        # Manage the transaction ourselves and tune the pager for bulk work
+        conn.isolation_level = None
+        previous_journal_mode = cursor.execute("PRAGMA journal_mode").fetchone()[0]
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-65536")
+        
         # Get count of existing orders before deletion
         cursor.execute("SELECT COUNT(*) FROM orders")
         order_count = cursor.fetchone()[0]
@@ -30,23 +63,20 @@ def clear_order_history(db_path="blue_pharma_v2.db"):
         cursor.execute("SELECT COUNT(*) FROM order_items")
         order_items_count = cursor.fetchone()[0]
         
-        logger.info(f"Found {order_count} orders and {order_items_count} order items to remove")
-        
         if order_count == 0:
             logger.info("No orders found - database is already clean of order history")
-            conn.close()
-            return
-        
-        # Delete order items first (due to foreign key constraints)
-        logger.info("Removing order items...")
-        cursor.execute("DELETE FROM order_items")
-        
-        # Delete orders
-        logger.info("Removing orders...")
-        cursor.execute("DELETE FROM orders")
-        
-        # Commit the changes
-        conn.commit()
+            return conn
+        
+        # Run both deletes in a single write transaction; the connection
+        # context manager commits on success and rolls back on any error
+        with conn:
+            cursor.execute("BEGIN IMMEDIATE")
+            
+            # Delete order items first (due to foreign key constraints)
+            cursor.execute("DELETE FROM order_items")
+            
+            # Delete orders
+            cursor.execute("DELETE FROM orders")
         
         # Verify deletion
         cursor.execute("SELECT COUNT(*) FROM orders")
@@ -55,76 +85,87 @@ def clear_order_history(db_path="blue_pharma_v2.db"):
         cursor.execute("SELECT COUNT(*) FROM order_items")
         remaining_items = cursor.fetchone()[0]
         
-        logger.info(f"✅ Successfully cleared order history!")
-        logger.info(f"   - Removed {order_count} orders")
-        logger.info(f"   - Removed {order_items_count} order items")
-        logger.info(f"   - Remaining orders: {remaining_orders}")
-        logger.info(f"   - Remaining order items: {remaining_items}")
-        
-        # Vacuum database to reclaim space
-        logger.info("Optimizing database...")
-        cursor.execute("VACUUM")
-        
-        conn.close()
-        logger.info("✅ Database cleanup completed successfully!")
-        
-        print("\n" + "="*50)
-        print("🎉 ORDER HISTORY CLEARED SUCCESSFULLY!")
-        print("="*50)
-        print(f"✅ Removed {order_count} orders")
-        print(f"✅ Removed {order_items_count} order items")
-        print("✅ All other data preserved (users, medicines, etc.)")
-        print("\n🚀 Ready to test new clean order ID system!")
-        print("   New orders will start with ID: 01")
+        # Reclaim freed pages without rewriting the whole file. Databases
+        # created before auto_vacuum=INCREMENTAL get a one-time VACUUM to
+        # switch over (the new mode only takes effect after a VACUUM).
+        auto_vacuum = cursor.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if auto_vacuum == 2:
+            cursor.execute("PRAGMA incremental_vacuum")
+        else:
+            cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            cursor.execute("VACUUM")
+        
+        # Refresh planner statistics for the tables we just emptied
+        cursor.execute("PRAGMA optimize")
+        
+        logger.info("Cleared orders=%d items=%d (remaining orders=%d items=%d)",
+                    order_count, order_items_count, remaining_orders, remaining_items)
+        
+        summary = [
+            "",
+            "=" * 50,
+            "🎉 ORDER HISTORY CLEARED SUCCESSFULLY!",
+            "=" * 50,
+            f"✅ Removed {order_count} orders",
+            f"✅ Removed {order_items_count} order items",
+            "✅ All other data preserved (users, medicines, etc.)",
+            "",
+            "🚀 Ready to test new clean order ID system!",
+            "   New orders will start with ID: 01",
+        ]
+        sys.stdout.write("\n".join(summary) + "\n")
+        sys.stdout.flush()
+        return conn
         
     except sqlite3.Error as e:
-        logger.error(f"Database error: {e}")
-        if conn:
-            conn.rollback()
-            conn.close()
+        logger.error("Database error: %s", e)
         return False
         
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        if conn:
-            conn.rollback() 
-            conn.close()
+        logger.error("Unexpected error: %s", e)
         return False
+    
+    finally:
+        # Restore the journal mode the database was using before cleanup,
+        # whether the cleanup succeeded or not
+        if previous_journal_mode is not None:
+            try:
+                cursor.execute(f"PRAGMA journal_mode={previous_journal_mode}")
+            except sqlite3.Error as e:
+                logger.error("Could not restore journal_mode=%s: %s", previous_journal_mode, e)
 
-def verify_other_data_intact(db_path="blue_pharma_v2.db"):
-    """Verify that other data is still intact."""
+def verify_other_data_intact(db_path="blue_pharma_v2.db", conn=None):
+    """Verify that other data is still intact, reusing conn when given."""
     
     try:
-        conn = sqlite3.connect(db_path)
+        if conn is None:
+            conn = _get_conn(db_path)
         cursor = conn.cursor()
         
-        # Check users
-        cursor.execute("SELECT COUNT(*) FROM users")
-        user_count = cursor.fetchone()[0]
-        
-        # Check medicines  
-        cursor.execute("SELECT COUNT(*) FROM medicines")
-        medicine_count = cursor.fetchone()[0]
-        
-        conn.close()
+        # Check users and medicines in one round trip
+        cursor.execute("SELECT (SELECT COUNT(*) FROM users), (SELECT COUNT(*) FROM medicines)")
+        user_count, medicine_count = cursor.fetchone()
         
-        print("\n📊 DATA VERIFICATION:")
-        print(f"   Users: {user_count} (preserved)")
-        print(f"   Medicines: {medicine_count} (preserved)")
-        print("   Orders: 0 (cleared)")
+        sys.stdout.write(
+            "\n📊 DATA VERIFICATION:\n"
+            f"   Users: {user_count} (preserved)\n"
+            f"   Medicines: {medicine_count} (preserved)\n"
+            "   Orders: 0 (cleared)\n"
+        )
+        sys.stdout.flush()
         
     except Exception as e:
-        logger.error(f"Error verifying data: {e}")
+        logger.error("Error verifying data: %s", e)
 
 if __name__ == "__main__":
     print("🗑️  CLEARING ORDER HISTORY ONLY...")
     print("=" * 50)
     
     # Clear order history
-    clear_order_history()
+    conn = clear_order_history()
     
-    # Verify other data is intact
-    verify_other_data_intact()
+    # Verify other data is intact on the same, still-warm connection
+    verify_other_data_intact(conn=conn or None)
     
     print("\n✨ You can now test the new clean order ID system!")
     print("   The next order will have ID: 01")
\ No newline at end of file
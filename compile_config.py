@@ -0,0 +1,40 @@
+"""
+Helper script to compile the .env file into config/_compiled.py
+
+Run this at deploy time. Config then imports the compiled values instead of
+parsing .env on every start. Re-run it whenever .env changes, or delete
+config/_compiled.py to go back to reading .env directly.
+"""
+
+from pathlib import Path
+
+from dotenv import dotenv_values
+
+def compile_env_file():
+    """Write the .env values to config/_compiled.py as a Python dict literal"""
+    env_file = Path('.env')
+    compiled_file = Path('config') / '_compiled.py'
+
+    if not env_file.exists():
+        print("❌ .env file not found!")
+        return False
+
+    values = {key: value for key, value in dotenv_values(env_file).items() if value is not None}
+
+    lines = [
+        "# -*- coding: utf-8 -*-\n",
+        "# Generated by compile_config.py from .env - do not edit, re-run the script instead\n",
+        "\n",
+        "ENV = {\n",
+    ]
+    lines.extend(f"    {key!r}: {value!r},\n" for key, value in sorted(values.items()))
+    lines.append("}\n")
+
+    with open(compiled_file, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+
+    print(f"✅ Compiled {len(values)} settings into {compiled_file}")
+    return True
+
+if __name__ == "__main__":
+    compile_env_file()
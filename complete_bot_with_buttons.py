@@ -8,19 +8,29 @@ Includes comprehensive button interface with new 6-field medicine system
 import sys
 import logging
 import asyncio
-import os
-import tempfile
+import concurrent.futures
+import functools
+import importlib.util
+import io
+import multiprocessing
+import re
+import sqlite3
+import time
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from typing import Dict, List, Optional
 
-# Excel processing imports
-try:
-    import pandas as pd
+from database_manager_v2 import MedicineRecord
+
+# Excel processing imports (openpyxl is only imported when an Excel feature is used)
+EXCEL_SUPPORT = importlib.util.find_spec('openpyxl') is not None
+if not EXCEL_SUPPORT:
+    print("⚠️ Excel support not available. Install with: pip install openpyxl")
+
+def _get_excel_libs():
+    """Import openpyxl on first use so bot startup does not pay for it"""
     import openpyxl
-    EXCEL_SUPPORT = True
-except ImportError:
-    EXCEL_SUPPORT = False
-    print("⚠️ Excel support not available. Install with: pip install pandas openpyxl")
+    return openpyxl
 
 # Configure logging
 logging.basicConfig(
@@ -33,6 +43,269 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Answers shared by the add-medicine flow and the Excel upload
+_SKIP_RE = re.compile(r'^\s*skip\s*$', re.IGNORECASE)
+_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+def _is_iso_date(text: str) -> bool:
+    """Check for a real YYYY-MM-DD date, trying strptime only on well-shaped text"""
+    if not _DATE_RE.match(text):
+        return False
+    try:
+        datetime.strptime(text, '%Y-%m-%d')
+    except ValueError:
+        return False
+    return True
+
+# Upload limit advertised in the bulk add instructions
+MAX_EXCEL_MEDICINES = 1000
+XLSX_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Markdown control characters dropped from user-supplied text before it is echoed back
+MARKDOWN_STRIP_TABLE = str.maketrans('', '', '*_[]')
+
+def _excel_cell_text(value):
+    """Return a stripped cell value as text, or None for blank cells"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.strip() or None
+    return str(value)
+
+def _excel_cell_date(value):
+    """Return a date cell as YYYY-MM-DD; text cells are kept as typed"""
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+    return _excel_cell_text(value)
+
+def process_excel_file(excel_file):
+    """Process an Excel file (path or binary file object) and return list of medicines"""
+    try:
+        # Stream the first sheet row by row instead of loading it into a DataFrame
+        openpyxl = _get_excel_libs()
+        workbook = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, ())
+            columns = {str(col).strip(): i for i, col in enumerate(header) if col is not None}
+            
+            # Expected columns
+            required_columns = ['Medicine Name', 'Price']
+            
+            # Check required columns
+            missing_required = [col for col in required_columns if col not in columns]
+            if missing_required:
+                return {'error': f"Missing required columns: {', '.join(missing_required)}"}
+            
+            def column_getter(col):
+                i = columns.get(col)
+                if i is None:
+                    return lambda row: None
+                return lambda row: row[i] if i < len(row) else None
+            
+            get_name = column_getter('Medicine Name')
+            get_price = column_getter('Price')
+            get_batch = column_getter('Batch Number')
+            get_mfg_date = column_getter('Manufacturing Date')
+            get_exp_date = column_getter('Expiring Date')
+            get_dosage_form = column_getter('Dosage Form')
+            get_stock = column_getter('Stock Quantity')
+            
+            # Process medicines
+            medicines = []
+            errors = []
+            
+            for row_number, row in enumerate(rows, 2):
+                if all(value is None for value in row):
+                    continue
+                if len(medicines) >= MAX_EXCEL_MEDICINES:
+                    # Stop reading instead of parsing the rest of an oversized sheet
+                    errors.append(f"Row {row_number}: Limit of {MAX_EXCEL_MEDICINES} medicines per file reached, remaining rows skipped")
+                    break
+                try:
+                    # Required fields
+                    name = _excel_cell_text(get_name(row))
+                    if not name:
+                        errors.append(f"Row {row_number}: Medicine name is required")
+                        continue
+                    
+                    try:
+                        price = float(get_price(row))
+                        if price < 0:
+                            errors.append(f"Row {row_number}: Price cannot be negative")
+                            continue
+                    except (ValueError, TypeError):
+                        errors.append(f"Row {row_number}: Invalid price format")
+                        continue
+                    
+                    # Handle stock quantity (optional, defaults to 0)
+                    try:
+                        stock_quantity = int(float(get_stock(row) or 0))
+                        if stock_quantity < 0:
+                            errors.append(f"Row {row_number}: Stock quantity cannot be negative, setting to 0")
+                            stock_quantity = 0
+                    except (ValueError, TypeError):
+                        stock_quantity = 0
+                    
+                    mfg_date = _excel_cell_date(get_mfg_date(row))
+                    if mfg_date and not _is_iso_date(mfg_date):
+                        errors.append(f"Row {row_number}: Manufacturing date must be YYYY-MM-DD, leaving it empty")
+                        mfg_date = None
+                    exp_date = _excel_cell_date(get_exp_date(row))
+                    if exp_date and not _is_iso_date(exp_date):
+                        errors.append(f"Row {row_number}: Expiring date must be YYYY-MM-DD, leaving it empty")
+                        exp_date = None
+                    
+                    medicines.append(MedicineRecord(
+                        name=name,
+                        batch_number=_excel_cell_text(get_batch(row)),
+                        manufacturing_date=mfg_date,
+                        expiring_date=exp_date,
+                        dosage_form=_excel_cell_text(get_dosage_form(row)),
+                        price=price,
+                        stock_quantity=stock_quantity
+                    ))
+                    
+                except Exception as e:
+                    errors.append(f"Row {row_number}: Error processing row - {str(e)}")
+        finally:
+            workbook.close()
+        
+        if not medicines:
+            return {'error': 'No valid medicines found in file'}
+        
+        return {
+            'medicines': medicines,
+            'errors': errors,
+            'total_processed': len(medicines)
+        }
+        
+    except Exception as e:
+        return {'error': f'Error reading Excel file: {str(e)}'}
+
+EXPORT_HEADERS = (
+    'Medicine Name', 'Batch Number', 'Manufacturing Date', 'Expiring Date',
+    'Dosage Form', 'Price (ETB)', 'Stock Quantity'
+)
+
+def inventory_export_rows(medicines):
+    """Flatten medicine rows into plain tuples in EXPORT_HEADERS order"""
+    return [
+        (
+            med['name'],
+            med['batch_number'] or None,
+            med['manufacturing_date'] or None,
+            med['expiring_date'] or None,
+            med['dosage_form'] or None,
+            med['price'],
+            med['stock_quantity']
+        )
+        for med in medicines
+    ]
+
+def write_inventory_workbook(rows):
+    """Stream export rows into a write-only workbook and return the .xlsx bytes"""
+    openpyxl = _get_excel_libs()
+    
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet('Medicines Inventory')
+    
+    # Column widths go out before the rows in write-only mode, so size them first,
+    # walking each column of the plain rows once (empty cells count as zero width)
+    for index, column in enumerate(zip(EXPORT_HEADERS, *rows), 1):
+        max_length = max(len(str(value)) for value in column if value is not None)
+        column_letter = openpyxl.utils.get_column_letter(index)
+        worksheet.column_dimensions[column_letter].width = min(max_length + 2, 50)
+    
+    worksheet.append(EXPORT_HEADERS)
+    for row in rows:
+        worksheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+# Excel parsing and writing hold the GIL for seconds on big sheets, so they run in a worker
+# process. Uploads are occasional, so one worker is enough; it is spawned rather than forked
+# so it does not inherit the bot's event loop threads or open SQLite connections.
+EXCEL_POOL_WORKERS = 1
+_excel_pool = None
+
+def _get_excel_pool():
+    """Start the Excel worker pool on first use"""
+    global _excel_pool
+    if _excel_pool is None:
+        _excel_pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=EXCEL_POOL_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _excel_pool
+
+async def run_excel_job(func, *args):
+    """Run a module-level Excel function in the worker pool, or a thread if the pool is unusable"""
+    global _excel_pool
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_excel_pool(), func, *args)
+    except (OSError, BrokenProcessPool) as e:
+        logger.warning("Excel worker pool unavailable (%s), running %s in a thread", e, func.__name__)
+        _excel_pool = None
+        return await asyncio.to_thread(func, *args)
+
+class ExpiringUserData(dict):
+    """Per-user flow state that forgets users who have been idle for longer than ttl seconds"""
+    
+    def __init__(self, ttl: float):
+        super().__init__()
+        self.ttl = ttl
+        self._touched = {}
+        self._last_sweep = time.monotonic()
+    
+    def _expire(self, key, now):
+        if dict.__contains__(self, key) and now - self._touched[key] > self.ttl:
+            self.__delitem__(key)
+    
+    def _sweep(self, now):
+        # Abandoned flows are only dropped once per ttl, so inserts stay O(1) on average
+        if now - self._last_sweep < self.ttl:
+            return
+        self._last_sweep = now
+        for key in [k for k, touched in self._touched.items() if now - touched > self.ttl]:
+            self.__delitem__(key)
+    
+    def __contains__(self, key):
+        self._expire(key, time.monotonic())
+        return dict.__contains__(self, key)
+    
+    def __getitem__(self, key):
+        now = time.monotonic()
+        self._expire(key, now)
+        value = dict.__getitem__(self, key)
+        self._touched[key] = now
+        return value
+    
+    def __setitem__(self, key, value):
+        now = time.monotonic()
+        self._sweep(now)
+        dict.__setitem__(self, key, value)
+        self._touched[key] = now
+    
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        del self._touched[key]
+    
+    def session(self, key):
+        """Return the state dict for key, creating an empty one if needed"""
+        if key not in self:
+            self[key] = {}
+        return self[key]
+    
+    def clear_flow(self, key, flow):
+        """Drop one flow's entry for key, and key itself once no flow is left"""
+        if key in self:
+            state = self[key]
+            state.pop(flow, None)
+            if not state:
+                del self[key]
+
 def main():
     """Main bot function with complete button interface"""
     print("🏥 Blue Pharma Trading PLC - Complete Bot with Buttons")
@@ -43,8 +316,8 @@ def main():
     try:
         # Import required modules
         from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup
-        from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, ConversationHandler, filters
-        from database_manager_v2 import DatabaseManager
+        from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, ConversationHandler, filters, AIORateLimiter
+        from database_manager_v2 import DatabaseManager, ConnectionPool
         
         print("✅ All modules imported successfully")
         
@@ -54,6 +327,7 @@ def main():
         
         # Initialize database
         db = DatabaseManager(DB_NAME)
+        pool = ConnectionPool(DB_NAME, size=8)
         print("✅ Database initialized")
         
         # Conversation states
@@ -64,58 +338,173 @@ def main():
         (WAITING_FOR_EXCEL_FILE) = 30
         (PIN_VERIFICATION) = 40
         
+        # Add-medicine replies, keyed by the state each one moves the conversation to
+        ADD_MEDICINE_PROMPTS = {
+            BATCH_NUMBER: (
+                "✅ Medicine Name: {value}\n\n"
+                "**Question 2/7:** What is the batch number?\n"
+                "(Enter 'skip' if not available)"
+            ),
+            MANUFACTURING_DATE: (
+                "✅ Batch Number: {value}\n\n"
+                "**Question 3/7:** Manufacturing date (YYYY-MM-DD)?\n"
+                "(Enter 'skip' if not available)"
+            ),
+            EXPIRING_DATE: (
+                "✅ Manufacturing Date: {value}\n\n"
+                "**Question 4/7:** Expiring date (YYYY-MM-DD)?\n"
+                "(Enter 'skip' if not available)"
+            ),
+            DOSAGE_FORM: (
+                "✅ Expiring Date: {value}\n\n"
+                "**Question 5/7:** Dosage form?\n"
+                "Examples: Tablet, Capsule, Syrup, Injection, etc.\n"
+                "(Enter 'skip' if not available)"
+            ),
+            PRICE: (
+                "✅ Dosage Form: {value}\n\n"
+                "**Question 6/7:** Price in ETB?\n"
+                "Example: 25.50"
+            ),
+            STOCK_QUANTITY: (
+                "✅ Price: {value:.2f} ETB\n\n"
+                "**Question 7/7:** How many units are in stock?\n"
+                "Example: 100\n"
+                "(Enter 0 if no stock available yet)"
+            ),
+        }
+        
         # User roles
         USER_ROLES = {
             'customer': 'Customer',
             'staff': 'Staff',
             'admin': 'Administrator'
         }
+        STAFF_ROLES = frozenset({'staff', 'admin'})
+        ADMIN_ROLES = frozenset({'admin'})
+        
+        # User data storage: user_id -> {flow: state}, one entry per running flow
+        # ('new_medicine', 'awaiting_excel', 'awaiting_pin'); flows idle for an hour are dropped
+        USER_DATA_TTL = 3600
+        user_data = ExpiringUserData(USER_DATA_TTL)
         
-        # User data storage
-        user_data = {}
+        # Cached user records: telegram_id -> (user, cached_at). The bot never changes
+        # user rows itself; role or status changes made by the admin scripts show up
+        # once the cached record is older than USER_CACHE_TTL.
+        USER_CACHE_TTL = 300
+        _user_cache = {}
+        
+        # INSERT ... RETURNING needs SQLite 3.35+; older system builds (e.g. 3.31) lack it
+        SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
         
         # User management helper
-        def get_or_create_user(telegram_id, first_name, last_name=None, username=None):
-            """Get or create user"""
+        def _get_or_create_user_sync(telegram_id, first_name, last_name=None, username=None):
+            """Get or create user (blocking; use get_or_create_user from handlers)"""
             try:
-                conn = db.get_connection()
-                cursor = conn.cursor()
-                
-                # Try to get existing user
-                cursor.execute("""
-                    SELECT id, first_name, user_type FROM users 
-                    WHERE telegram_id = ? AND is_active = 1
-                """, (telegram_id,))
-                user = cursor.fetchone()
+                with pool.connection() as conn:
+                    # Try to get existing user
+                    user = conn.execute("""
+                        SELECT id, first_name, user_type FROM users 
+                        WHERE telegram_id = ? AND is_active = 1
+                    """, (telegram_id,)).fetchone()
                 
                 if user:
-                    conn.close()
-                    return dict(user)
-                
-                # Create new user
-                cursor.execute("""
-                    INSERT INTO users (telegram_id, first_name, last_name, username, user_type)
-                    VALUES (?, ?, ?, ?, 'customer')
-                """, (telegram_id, first_name, last_name, username))
-                
-                user_id = cursor.lastrowid
-                conn.commit()
-                conn.close()
-                
-                return {
-                    'id': user_id,
-                    'first_name': first_name,
-                    'user_type': 'customer'
-                }
+                    return user
+                
+                with pool.write_connection() as conn:
+                    if not SQLITE_HAS_RETURNING:
+                        # Older SQLite: insert unless present, then read the row back
+                        conn.execute("""
+                            INSERT OR IGNORE INTO users (telegram_id, first_name, last_name, username, user_type)
+                            VALUES (?, ?, ?, ?, 'customer')
+                        """, (telegram_id, first_name, last_name, username))
+                        return conn.execute("""
+                            SELECT id, first_name, user_type FROM users
+                            WHERE telegram_id = ? AND is_active = 1
+                        """, (telegram_id,)).fetchone()
+                    
+                    # Create new user in one upsert; if a concurrent press already inserted
+                    # it, the no-op update returns that row (nothing for deactivated users)
+                    return conn.execute("""
+                        INSERT INTO users (telegram_id, first_name, last_name, username, user_type)
+                        VALUES (?, ?, ?, ?, 'customer')
+                        ON CONFLICT(telegram_id) DO UPDATE SET first_name = users.first_name
+                        WHERE users.is_active = 1
+                        RETURNING id, first_name, user_type
+                    """, (telegram_id, first_name, last_name, username)).fetchone()
             except Exception as e:
-                logger.error(f"User management error: {e}")
+                logger.error("User management error: %s", e)
                 return None
         
+        async def get_or_create_user(telegram_id, first_name, last_name=None, username=None):
+            """Get or create user without blocking the event loop, using a short-lived cache"""
+            cached = _user_cache.get(telegram_id)
+            if cached and time.monotonic() - cached[1] < USER_CACHE_TTL:
+                return cached[0]
+            
+            user = await asyncio.to_thread(_get_or_create_user_sync, telegram_id, first_name, last_name, username)
+            if user:
+                _user_cache[telegram_id] = (user, time.monotonic())
+            return user
+        
+        # Medicine list shared by the read-only handlers. Every write in this process bumps
+        # 'version'; the TTL only bounds staleness from writes made outside the bot.
+        MEDICINES_CACHE_TTL = 60.0
+        _medicines_cache = {'version': 0, 'rows_version': -1, 'ts': 0.0, 'rows': None}
+        _medicines_cache_lock = asyncio.Lock()
+        
+        def _fresh_cached_medicines():
+            """Return the cached medicine list if it is still current, else None"""
+            if (_medicines_cache['rows_version'] == _medicines_cache['version']
+                    and time.monotonic() - _medicines_cache['ts'] < MEDICINES_CACHE_TTL):
+                return _medicines_cache['rows']
+            return None
+        
+        async def cached_medicines():
+            """Get all active medicines, reusing the last list while the inventory is unchanged"""
+            rows = _fresh_cached_medicines()
+            if rows is not None:
+                return rows
+            
+            # Concurrent misses wait for one query instead of each scanning the table
+            async with _medicines_cache_lock:
+                rows = _fresh_cached_medicines()
+                if rows is not None:
+                    return rows
+                now = time.monotonic()
+                version = _medicines_cache['version']
+                rows = await asyncio.to_thread(db.get_all_medicines)
+                # Stamp with the version read before the query, so a write that lands while
+                # it runs leaves the entry stale instead of hiding the change
+                _medicines_cache.update(rows=rows, rows_version=version, ts=now)
+                return rows
+        
+        def invalidate_medicines_cache():
+            """Mark the cached medicine list stale (call after adding, updating or removing medicines)"""
+            _medicines_cache['version'] += 1
+        
+        # Last view sent to each chat's menu message: chat_id -> (message_id, (text, parse_mode, reply_markup))
+        _last_views = {}
+        
+        async def edit_message(query, text, **kwargs):
+            """Edit the query's message, skipping the API call when it already shows this view"""
+            message = query.message
+            if message is None:
+                return await query.edit_message_text(text, **kwargs)
+            
+            view = (text, kwargs.get('parse_mode'), kwargs.get('reply_markup'))
+            if _last_views.get(message.chat_id) == (message.message_id, view):
+                return message
+            
+            result = await query.edit_message_text(text, **kwargs)
+            _last_views[message.chat_id] = (message.message_id, view)
+            return result
+        
         def get_user_keyboard(user_type: str) -> List[List[InlineKeyboardButton]]:
             """Get role-based inline keyboard"""
             keyboard = []
             
-            if user_type in ['staff', 'admin']:
+            if user_type in STAFF_ROLES:
                 # Primary admin/staff buttons - most used functions
                 keyboard.append([
                     InlineKeyboardButton("📦 Manage Stock", callback_data="manage_stock"),
@@ -152,155 +541,27 @@ def main():
             
             return keyboard
         
-        # Bot handlers
-        async def start_command(update: Update, context):
-            """Enhanced start command with comprehensive button interface"""
-            user = update.effective_user
-            telegram_user = get_or_create_user(user.id, user.first_name, user.last_name, user.username)
-            
-            if not telegram_user:
-                await update.message.reply_text("Sorry, there was an error. Please try again.")
-                return
-            
-            user_type = telegram_user['user_type']
-            role_display = USER_ROLES.get(user_type, user_type.title())
-            
-            welcome_text = f"""
-🏥 **Welcome to Blue Pharma Trading PLC!**
-
-Hello {telegram_user['first_name']}! I'm your comprehensive pharmacy management bot.
-
-👤 **Your Access Level:** {role_display}
-
-💊 **Our Enhanced 7-Field Medicine System:**
-1. Medicine Name
-2. Batch Number  
-3. Manufacturing Date
-4. Expiring Date
-5. Dosage Form
-6. Price (ETB)
-7. Stock Quantity
-
-🎯 **What would you like to do today?**
-Choose from the options below:
-"""
-            
-            # Create role-based keyboard
-            keyboard = get_user_keyboard(user_type)
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await update.message.reply_text(
-                welcome_text, 
-                parse_mode='Markdown',
-                reply_markup=reply_markup
-            )
-        
-        async def button_handler(update: Update, context):
-            """Handle all inline button presses"""
-            query = update.callback_query
-            await query.answer()
-            
-            user = query.from_user
-            user_info = get_or_create_user(user.id, user.first_name, user.last_name, user.username)
-            
-            if not user_info:
-                await query.edit_message_text("Error accessing user information. Please try /start")
-                return
-            
-            user_type = user_info['user_type']
-            data = query.data
-            
-            # Route button presses
-            if data == "manage_stock":
-                await handle_manage_stock(query, user_type)
-            elif data == "check_medicine":
-                await handle_check_medicine(query)
-            elif data == "add_medicine":
-                await handle_add_medicine_button(query, user_type)
-            elif data == "view_stats":
-                await handle_view_stats(query, user_type)
-            elif data == "view_orders":
-                await handle_view_orders(query, user_type)
-            elif data == "update_prices":
-                await handle_update_prices(query, user_type)
-            elif data == "edit_contact":
-                await handle_edit_contact(query, user_type)
-            elif data == "manage_users":
-                await handle_manage_users(query, user_type)
-            elif data == "contact_info":
-                await handle_contact_info(query)
-            elif data == "help":
-                await handle_help(query, user_type)
-            elif data == "place_order":
-                await handle_place_order(query)
-            elif data == "my_orders":
-                await handle_my_orders(query)
-            elif data == "request_wholesale":
-                await handle_request_wholesale(query)
-            elif data == "add_single_medicine":
-                await handle_add_single_medicine(query, user_type)
-            elif data == "add_bulk_medicine":
-                await handle_add_bulk_medicine(query, user_type)
-            elif data == "low_stock_alert":
-                await handle_low_stock_alert(query, user_type)
-            elif data == "remove_medicine":
-                await handle_remove_medicine(query, user_type)
-            elif data == "remove_all_medicines":
-                await handle_remove_all_medicines(query, user_type)
-            else:
-                await query.edit_message_text("Feature coming soon! 🚀")
+        # Role-based main menus, built once and shared by every reply
+        ADMIN_MARKUP = InlineKeyboardMarkup(get_user_keyboard('admin'))
+        STAFF_MARKUP = InlineKeyboardMarkup(get_user_keyboard('staff'))
+        CUSTOMER_MARKUP = InlineKeyboardMarkup(get_user_keyboard('customer'))
+        ROLE_MARKUPS = {
+            'admin': ADMIN_MARKUP,
+            'staff': STAFF_MARKUP,
+            'customer': CUSTOMER_MARKUP
+        }
         
-        # Button handler functions
-        async def handle_manage_stock(query, user_type):
-            """Handle stock management button"""
-            if user_type not in ['staff', 'admin']:
-                await query.edit_message_text("❌ Access denied. Staff/Admin access required.")
-                return
-            
-            try:
-                # Get stock overview
-                medicines = db.get_all_medicines(20)
-                total_medicines = len(medicines)
-                total_stock = sum(med['stock_quantity'] for med in medicines)
-                low_stock = len([med for med in medicines if med['stock_quantity'] <= 10])
-                out_of_stock = len([med for med in medicines if med['stock_quantity'] == 0])
-                
-                stock_text = f"""
-📦 **Stock Management Overview**
-
-📊 **Current Status:**
-• Total Medicines: {total_medicines}
-• Total Stock Units: {total_stock:,}
-• Low Stock Items: {low_stock}
-• Out of Stock: {out_of_stock}
-
-🔧 **Available Actions:**
-• Use `/add_medicine` to add new medicines
-• Use `/update_stock` to update quantities
-• Use `/medicines` to view all inventory
-
-💡 **Quick Actions:**
-"""
-                
-                keyboard = [
-                    [InlineKeyboardButton("📝 Add Medicine", callback_data="add_medicine")],
-                    [InlineKeyboardButton("📊 View All Medicines", callback_data="view_all_medicines")],
-                    [InlineKeyboardButton("⚠️ Low Stock Alert", callback_data="low_stock_alert")],
-                    [InlineKeyboardButton("🗑️ Remove Medicine", callback_data="remove_medicine"),
-                     InlineKeyboardButton("🗑️ Remove All", callback_data="remove_all_medicines")],
-                    [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                await query.edit_message_text(stock_text, parse_mode='Markdown', reply_markup=reply_markup)
-                
-            except Exception as e:
-                logger.error(f"Error in stock management: {e}")
-                await query.edit_message_text("Error retrieving stock information.")
+        # Static menu texts and keyboards for the button handlers
+        MANAGE_STOCK_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📝 Add Medicine", callback_data="add_medicine")],
+            [InlineKeyboardButton("📊 View All Medicines", callback_data="view_all_medicines")],
+            [InlineKeyboardButton("⚠️ Low Stock Alert", callback_data="low_stock_alert")],
+            [InlineKeyboardButton("🗑️ Remove Medicine", callback_data="remove_medicine"),
+             InlineKeyboardButton("🗑️ Remove All", callback_data="remove_all_medicines")],
+            [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
+        ])
         
-        async def handle_check_medicine(query):
-            """Handle check medicine button"""
-            check_text = """
+        CHECK_MEDICINE_TEXT = """
 💊 **Check Medicine Information**
 
 To check medicine details, use one of these commands:
@@ -320,22 +581,12 @@ To check medicine details, use one of these commands:
 • Batch information
 • Expiration dates
 """
-            
-            keyboard = [
-                [InlineKeyboardButton("📋 View All Medicines", callback_data="view_all_medicines")],
-                [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(check_text, parse_mode='Markdown', reply_markup=reply_markup)
+        CHECK_MEDICINE_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📋 View All Medicines", callback_data="view_all_medicines")],
+            [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
+        ])
         
-        async def handle_add_medicine_button(query, user_type):
-            """Handle add medicine button - Show two options"""
-            if user_type not in ['staff', 'admin']:
-                await query.edit_message_text("❌ Access denied. Staff/Admin access required.")
-                return
-            
-            add_text = """
+        ADD_MEDICINE_TEXT = """
 📝 **Add Medicine - Choose Method**
 
 🎯 **Choose how you want to add medicines:**
@@ -354,75 +605,20 @@ To check medicine details, use one of these commands:
 1. Medicine Name | 2. Batch Number | 3. Manufacturing Date
 4. Expiring Date | 5. Dosage Form | 6. Price (ETB) | 7. Stock Quantity
 """
-            
-            keyboard = [
-                [InlineKeyboardButton("📝 Add Single Medicine", callback_data="add_single_medicine")],
-                [InlineKeyboardButton("📊 Add Many Medicines (Excel)", callback_data="add_bulk_medicine")],
-                [InlineKeyboardButton("📋 View Current Inventory", callback_data="view_all_medicines")],
-                [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(add_text, parse_mode='Markdown', reply_markup=reply_markup)
+        ADD_MEDICINE_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📝 Add Single Medicine", callback_data="add_single_medicine")],
+            [InlineKeyboardButton("📊 Add Many Medicines (Excel)", callback_data="add_bulk_medicine")],
+            [InlineKeyboardButton("📋 View Current Inventory", callback_data="view_all_medicines")],
+            [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
+        ])
         
-        async def handle_view_stats(query, user_type):
-            """Handle view statistics button"""
-            if user_type not in ['staff', 'admin']:
-                await query.edit_message_text("❌ Access denied. Staff/Admin access required.")
-                return
-            
-            try:
-                medicines = db.get_all_medicines()
-                total_medicines = len(medicines)
-                total_stock = sum(med['stock_quantity'] for med in medicines)
-                total_value = sum(med['price'] * med['stock_quantity'] for med in medicines)
-                avg_price = sum(med['price'] for med in medicines) / len(medicines) if medicines else 0
-                
-                # Get dosage form distribution
-                dosage_forms = {}
-                for med in medicines:
-                    form = med['dosage_form'] or 'Unknown'
-                    dosage_forms[form] = dosage_forms.get(form, 0) + 1
-                
-                top_forms = sorted(dosage_forms.items(), key=lambda x: x[1], reverse=True)[:5]
-                
-                stats_text = f"""
-📊 **Pharmacy Statistics**
-
-📈 **Inventory Overview:**
-• Total Medicines: {total_medicines}
-• Total Stock Units: {total_stock:,}
-• Total Inventory Value: {total_value:,.2f} ETB
-• Average Medicine Price: {avg_price:.2f} ETB
-
-💊 **Top Dosage Forms:**
-"""
-                
-                for form, count in top_forms:
-                    stats_text += f"• {form}: {count} medicines\n"
-                
-                stats_text += f"\n📅 **Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-                
-                keyboard = [
-                    [InlineKeyboardButton("📦 Stock Details", callback_data="stock_details")],
-                    [InlineKeyboardButton("⚠️ Low Stock Alert", callback_data="low_stock_alert")],
-                    [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                await query.edit_message_text(stats_text, parse_mode='Markdown', reply_markup=reply_markup)
-                
-            except Exception as e:
-                logger.error(f"Error in view stats: {e}")
-                await query.edit_message_text("Error retrieving statistics.")
+        VIEW_STATS_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📦 Stock Details", callback_data="stock_details")],
+            [InlineKeyboardButton("⚠️ Low Stock Alert", callback_data="low_stock_alert")],
+            [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
+        ])
         
-        async def handle_view_orders(query, user_type):
-            """Handle view orders button"""
-            if user_type not in ['staff', 'admin']:
-                await query.edit_message_text("❌ Access denied. Staff/Admin access required.")
-                return
-            
-            orders_text = """
+        VIEW_ORDERS_TEXT = """
 📋 **Order Management**
 
 🔧 **Available Actions:**
@@ -443,24 +639,14 @@ To check medicine details, use one of these commands:
 • `/orders` - View recent orders
 • `/orders pending` - View pending orders only
 """
-            
-            keyboard = [
-                [InlineKeyboardButton("📋 All Orders", callback_data="all_orders")],
-                [InlineKeyboardButton("⏳ Pending Orders", callback_data="pending_orders")],
-                [InlineKeyboardButton("✅ Recent Completed", callback_data="completed_orders")],
-                [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(orders_text, parse_mode='Markdown', reply_markup=reply_markup)
+        VIEW_ORDERS_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📋 All Orders", callback_data="all_orders")],
+            [InlineKeyboardButton("⏳ Pending Orders", callback_data="pending_orders")],
+            [InlineKeyboardButton("✅ Recent Completed", callback_data="completed_orders")],
+            [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
+        ])
         
-        async def handle_update_prices(query, user_type):
-            """Handle update prices button"""
-            if user_type not in ['staff', 'admin']:
-                await query.edit_message_text("❌ Access denied. Staff/Admin access required.")
-                return
-            
-            price_text = """
+        UPDATE_PRICES_TEXT = """
 💰 **Price Management**
 
 🔧 **How to Update Prices:**
@@ -480,23 +666,13 @@ To check medicine details, use one of these commands:
 • Prices should be in Ethiopian Birr (ETB)
 • Changes are logged for audit purposes
 """
-            
-            keyboard = [
-                [InlineKeyboardButton("💊 View Medicine Prices", callback_data="view_prices")],
-                [InlineKeyboardButton("📝 Bulk Price Update", callback_data="bulk_price_update")],
-                [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(price_text, parse_mode='Markdown', reply_markup=reply_markup)
+        UPDATE_PRICES_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("💊 View Medicine Prices", callback_data="view_prices")],
+            [InlineKeyboardButton("📝 Bulk Price Update", callback_data="bulk_price_update")],
+            [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
+        ])
         
-        async def handle_edit_contact(query, user_type):
-            """Handle edit contact button"""
-            if user_type not in ['staff', 'admin']:
-                await query.edit_message_text("❌ Access denied. Staff/Admin access required.")
-                return
-            
-            contact_text = """
+        EDIT_CONTACT_TEXT = """
 📝 **Edit Contact Information**
 
 📞 **Current Contact Details:**
@@ -513,25 +689,15 @@ To check medicine details, use one of these commands:
 • Update business hours
 • Change business name
 """
-            
-            keyboard = [
-                [InlineKeyboardButton("📍 Update Address", callback_data="update_address")],
-                [InlineKeyboardButton("📱 Update Phone", callback_data="update_phone")],
-                [InlineKeyboardButton("📧 Update Email", callback_data="update_email")],
-                [InlineKeyboardButton("🕐 Update Hours", callback_data="update_hours")],
-                [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(contact_text, parse_mode='Markdown', reply_markup=reply_markup)
+        EDIT_CONTACT_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📍 Update Address", callback_data="update_address")],
+            [InlineKeyboardButton("📱 Update Phone", callback_data="update_phone")],
+            [InlineKeyboardButton("📧 Update Email", callback_data="update_email")],
+            [InlineKeyboardButton("🕐 Update Hours", callback_data="update_hours")],
+            [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
+        ])
         
-        async def handle_manage_users(query, user_type):
-            """Handle manage users button"""
-            if user_type != 'admin':
-                await query.edit_message_text("❌ Access denied. Administrator access required.")
-                return
-            
-            users_text = """
+        MANAGE_USERS_TEXT = """
 👥 **User Management** (Admin Only)
 
 🔧 **Available Actions:**
@@ -552,21 +718,15 @@ To check medicine details, use one of these commands:
 • Wholesale customers
 • Recent registrations
 """
-            
-            keyboard = [
-                [InlineKeyboardButton("👥 All Users", callback_data="all_users")],
-                [InlineKeyboardButton("👨‍💼 Staff Members", callback_data="staff_members")],
-                [InlineKeyboardButton("🏢 Wholesale Users", callback_data="wholesale_users")],
-                [InlineKeyboardButton("📊 User Stats", callback_data="user_stats")],
-                [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(users_text, parse_mode='Markdown', reply_markup=reply_markup)
+        MANAGE_USERS_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("👥 All Users", callback_data="all_users")],
+            [InlineKeyboardButton("👨‍💼 Staff Members", callback_data="staff_members")],
+            [InlineKeyboardButton("🏢 Wholesale Users", callback_data="wholesale_users")],
+            [InlineKeyboardButton("📊 User Stats", callback_data="user_stats")],
+            [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
+        ])
         
-        async def handle_contact_info(query):
-            """Handle contact info button"""
-            contact_text = """
+        CONTACT_INFO_TEXT = """
 📞 **Contact Blue Pharma Trading PLC**
 
 🏥 **Business Information:**
@@ -590,111 +750,48 @@ To check medicine details, use one of these commands:
 
 **Professional pharmaceutical services with cutting-edge technology!** 🏥
 """
-            
-            keyboard = [
-                [InlineKeyboardButton("🗺️ Get Directions", callback_data="get_directions")],
-                [InlineKeyboardButton("📧 Email Us", callback_data="email_us")],
-                [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(contact_text, parse_mode='Markdown', reply_markup=reply_markup)
+        CONTACT_INFO_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("🗺️ Get Directions", callback_data="get_directions")],
+            [InlineKeyboardButton("📧 Email Us", callback_data="email_us")],
+            [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
+        ])
         
-        async def handle_help(query, user_type):
-            """Handle help button"""
-            help_text = f"""
-❓ **Help & Information**
+        HELP_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📋 View Commands", callback_data="view_commands")],
+            [InlineKeyboardButton("💡 Tips & Tricks", callback_data="tips_tricks")],
+            [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
+        ])
+        
+        PLACE_ORDER_TEXT = """
+🛒 **Place New Order**
 
-👤 **Your Access Level:** {USER_ROLES.get(user_type, user_type.title())}
+📋 **How to Order:**
+1. Browse available medicines with `/medicines`
+2. Check specific medicine with `/search [name]`
+3. Contact us to place your order
 
-📱 **Available Commands:**
+📞 **Order Methods:**
+• **Phone:** +251-11-555-0123
+• **Email:** contact@bluepharma.et
+• **In Person:** Visit our pharmacy
 
-**🔧 Basic Commands:**
-/start - Main menu with buttons
-/medicines - View all medicines
-/search [name] - Search medicines
-/contact - Contact information
-/help - This help message
-
-**💊 Medicine Commands:**
-/add_medicine - Add new medicine (Staff/Admin)
-/update_stock - Update stock quantities (Staff/Admin)
-
-**📊 7-Field Medicine System:**
-Our simplified system captures exactly what you need:
-1. Medicine Name
-2. Batch Number
-3. Manufacturing Date
-4. Expiring Date  
-5. Dosage Form
-6. Price (ETB)
-7. Stock Quantity
-
-**🎯 System Benefits:**
-✅ Simple and fast
-✅ Essential information only
-✅ Consistent data entry
-✅ Professional results
-"""
-            
-            if user_type in ['staff', 'admin']:
-                help_text += """
-**👨‍💼 Staff/Admin Features:**
-• Complete inventory management
-• Stock level monitoring
-• Price management
-• User administration
-• Analytics and reports
-"""
-            
-            keyboard = [
-                [InlineKeyboardButton("📋 View Commands", callback_data="view_commands")],
-                [InlineKeyboardButton("💡 Tips & Tricks", callback_data="tips_tricks")],
-                [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(help_text, parse_mode='Markdown', reply_markup=reply_markup)
-        
-        # Customer-specific handlers
-        async def handle_place_order(query):
-            """Handle place order button"""
-            order_text = """
-🛒 **Place New Order**
-
-📋 **How to Order:**
-1. Browse available medicines with `/medicines`
-2. Check specific medicine with `/search [name]`
-3. Contact us to place your order
-
-📞 **Order Methods:**
-• **Phone:** +251-11-555-0123
-• **Email:** contact@bluepharma.et
-• **In Person:** Visit our pharmacy
-
-💊 **What We Need:**
-• Medicine name and quantity
-• Your contact information
-• Delivery or pickup preference
+💊 **What We Need:**
+• Medicine name and quantity
+• Your contact information
+• Delivery or pickup preference
 
 🚚 **Delivery Options:**
 • Pickup from pharmacy
 • Home delivery (fees may apply)
 • Express delivery available
 """
-            
-            keyboard = [
-                [InlineKeyboardButton("💊 Browse Medicines", callback_data="view_all_medicines")],
-                [InlineKeyboardButton("📞 Call to Order", callback_data="call_to_order")],
-                [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(order_text, parse_mode='Markdown', reply_markup=reply_markup)
+        PLACE_ORDER_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("💊 Browse Medicines", callback_data="view_all_medicines")],
+            [InlineKeyboardButton("📞 Call to Order", callback_data="call_to_order")],
+            [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
+        ])
         
-        async def handle_my_orders(query):
-            """Handle my orders button"""
-            orders_text = """
+        MY_ORDERS_TEXT = """
 📦 **My Order History**
 
 📋 **Order Status Information:**
@@ -714,19 +811,13 @@ Contact us with your order reference:
 • Contact us for any changes
 • Pickup orders within 48 hours
 """
-            
-            keyboard = [
-                [InlineKeyboardButton("📞 Check Order Status", callback_data="check_order_status")],
-                [InlineKeyboardButton("🛒 Place New Order", callback_data="place_order")],
-                [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(orders_text, parse_mode='Markdown', reply_markup=reply_markup)
+        MY_ORDERS_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📞 Check Order Status", callback_data="check_order_status")],
+            [InlineKeyboardButton("🛒 Place New Order", callback_data="place_order")],
+            [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
+        ])
         
-        async def handle_request_wholesale(query):
-            """Handle request wholesale button"""
-            wholesale_text = """
+        REQUEST_WHOLESALE_TEXT = """
 🏢 **Request Wholesale Access**
 
 💰 **Wholesale Benefits:**
@@ -752,25 +843,13 @@ Contact our sales team:
 3. Account setup and approval
 4. Welcome package and training
 """
-            
-            keyboard = [
-                [InlineKeyboardButton("📞 Contact Sales Team", callback_data="contact_sales")],
-                [InlineKeyboardButton("📧 Email Application", callback_data="email_application")],
-                [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(wholesale_text, parse_mode='Markdown', reply_markup=reply_markup)
-        
-        # NEW FEATURE HANDLERS
+        REQUEST_WHOLESALE_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📞 Contact Sales Team", callback_data="contact_sales")],
+            [InlineKeyboardButton("📧 Email Application", callback_data="email_application")],
+            [InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]
+        ])
         
-        async def handle_add_single_medicine(query, user_type):
-            """Handle add single medicine button"""
-            if user_type not in ['staff', 'admin']:
-                await query.edit_message_text("❌ Access denied. Staff/Admin access required.")
-                return
-            
-            single_text = """
+        ADD_SINGLE_MEDICINE_TEXT = """
 📝 **Add Single Medicine**
 
 🔄 **Start the 7-Question Flow:**
@@ -790,46 +869,85 @@ Use the command `/add_medicine` to begin adding a single medicine.
 • Can skip optional fields
 • Immediate feedback
 • Perfect for individual medicines
+"""
+        ADD_SINGLE_MEDICINE_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("▶️ Start Adding Now", callback_data="start_single_add")],
+            [InlineKeyboardButton("📊 Switch to Bulk Add", callback_data="add_bulk_medicine")],
+            [InlineKeyboardButton("🔙 Back to Add Medicine", callback_data="add_medicine")]
+        ])
+
+        BACK_TO_MAIN_TEXT = "🏥 **Welcome back!** Choose an option below:"
+
+        def build_help_text(user_type):
+            """Build the help text for a role"""
+            help_text = f"""
+❓ **Help & Information**
+
+👤 **Your Access Level:** {USER_ROLES.get(user_type, user_type.title())}
+
+📱 **Available Commands:**
+
+**🔧 Basic Commands:**
+/start - Main menu with buttons
+/medicines - View all medicines
+/search [name] - Search medicines
+/contact - Contact information
+/help - This help message
+
+**💊 Medicine Commands:**
+/add_medicine - Add new medicine (Staff/Admin)
+/update_stock - Update stock quantities (Staff/Admin)
+
+**📊 7-Field Medicine System:**
+Our simplified system captures exactly what you need:
+1. Medicine Name
+2. Batch Number
+3. Manufacturing Date
+4. Expiring Date  
+5. Dosage Form
+6. Price (ETB)
+7. Stock Quantity
+
+**🎯 System Benefits:**
+✅ Simple and fast
+✅ Essential information only
+✅ Consistent data entry
+✅ Professional results
 """
             
-            keyboard = [
-                [InlineKeyboardButton("▶️ Start Adding Now", callback_data="start_single_add")],
-                [InlineKeyboardButton("📊 Switch to Bulk Add", callback_data="add_bulk_medicine")],
-                [InlineKeyboardButton("🔙 Back to Add Medicine", callback_data="add_medicine")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(single_text, parse_mode='Markdown', reply_markup=reply_markup)
-        
-        async def handle_add_bulk_medicine(query, user_type):
-            """Handle bulk medicine addition via Excel"""
-            if user_type not in ['staff', 'admin']:
-                await query.edit_message_text("❌ Access denied. Staff/Admin access required.")
-                return
+            if user_type in STAFF_ROLES:
+                help_text += """
+**👨‍💼 Staff/Admin Features:**
+• Complete inventory management
+• Stock level monitoring
+• Price management
+• User administration
+• Analytics and reports
+"""
             
-            if not EXCEL_SUPPORT:
-                error_text = """
+            return help_text
+
+        HELP_TEXTS = {role: build_help_text(role) for role in USER_ROLES}
+
+        EXCEL_MISSING_TEXT = """
 ❌ **Excel Support Not Available**
 
 🛠️ **Installation Required:**
 To use bulk medicine upload, install the required packages:
 
 ```
-pip install pandas openpyxl
+pip install openpyxl
 ```
 
 🔄 **Then restart the bot** to enable Excel functionality.
 """
-                
-                keyboard = [
-                    [InlineKeyboardButton("📝 Use Single Medicine Instead", callback_data="add_single_medicine")],
-                    [InlineKeyboardButton("🔙 Back to Add Medicine", callback_data="add_medicine")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                await query.edit_message_text(error_text, parse_mode='Markdown', reply_markup=reply_markup)
-                return
-            
-            bulk_text = """
+
+        EXCEL_MISSING_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📝 Use Single Medicine Instead", callback_data="add_single_medicine")],
+            [InlineKeyboardButton("🔙 Back to Add Medicine", callback_data="add_medicine")]
+        ])
+
+        ADD_BULK_MEDICINE_TEXT = """
 📊 **Bulk Medicine Addition (Excel)**
 
 📄 **Excel Format Required:**
@@ -843,7 +961,7 @@ Your Excel file must have these **exact column headers**:
 📝 **Instructions:**
 1. Create Excel file with above format
 2. Fill in your medicine data
-3. Save as .xlsx or .xls file
+3. Save as .xlsx file
 4. Upload the file using the button below
 
 ⚠️ **Important Notes:**
@@ -853,274 +971,503 @@ Your Excel file must have these **exact column headers**:
 • Dates in YYYY-MM-DD format
 • Maximum 1000 medicines per file
 """
+
+        ADD_BULK_MEDICINE_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📎 Upload Excel File", callback_data="upload_excel")],
+            [InlineKeyboardButton("📋 Download Template", callback_data="download_template")],
+            [InlineKeyboardButton("📝 Switch to Single Add", callback_data="add_single_medicine")],
+            [InlineKeyboardButton("🔙 Back to Add Medicine", callback_data="add_medicine")]
+        ])
+
+        LOW_STOCK_CLEAR_TEMPLATE = """
+✅ **No Low Stock Items!**
+
+🎉 **Great News:**
+All medicines have sufficient stock levels (>10 units).
+
+📊 **Current Status:**
+• Total medicines monitored: {}
+• Low stock threshold: ≤ 10 units
+• Medicines below threshold: 0
+
+📈 **Keep up the great inventory management!**
+"""
+
+        LOW_STOCK_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📈 Update Stock Levels", callback_data="update_stock_levels")],
+            [InlineKeyboardButton("📝 Add New Stock", callback_data="add_medicine")],
+            [InlineKeyboardButton("🔙 Back to Stock Management", callback_data="manage_stock")]
+        ])
+
+        REMOVE_MEDICINE_TEXT = """
+🗑️ **Remove Medicine**
+
+⚠️ **How to Remove a Medicine:**
+
+**Step 1:** Find the medicine you want to remove
+• Use `/medicines` to see all medicines
+• Use `/search [name]` to find specific medicine
+
+**Step 2:** Note down the medicine details
+• Medicine name
+• Batch number (if applicable)
+
+**Step 3:** Contact administrator
+• For safety, medicine removal requires manual confirmation
+• This prevents accidental deletions
+
+📞 **Contact Information:**
+• Phone: +251-11-555-0123
+• Email: admin@bluepharma.et
+
+🛡️ **Safety First:** This process ensures inventory integrity and prevents accidental data loss.
+"""
+
+        REMOVE_MEDICINE_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📊 View All Medicines", callback_data="view_all_medicines")],
+            [InlineKeyboardButton("🔍 Search Medicine", callback_data="search_medicine")],
+            [InlineKeyboardButton("🗑️ Remove All Medicines", callback_data="remove_all_medicines")],
+            [InlineKeyboardButton("🔙 Back to Stock Management", callback_data="manage_stock")]
+        ])
+
+        REMOVE_ALL_TEMPLATE = """
+⚠️ **DANGER - Remove All Medicines**
+
+🚨 **THIS ACTION CANNOT BE UNDONE!**
+
+📊 **What will be deleted:**
+• **{total_medicines}** medicines
+• **{total_value:,.2f} ETB** total inventory value
+• All medicine records and history
+• All batch and expiry information
+
+🗺️ **Why you might want to do this:**
+• Starting fresh with new inventory
+• System reset for testing
+• Major inventory restructuring
+
+🛠️ **Recommended Alternative:**
+Instead of deleting, consider exporting data first as backup.
+
+⚠️ **Are you absolutely sure you want to delete ALL medicines?**
+"""
+
+        REMOVE_ALL_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("✅ YES - DELETE ALL (Requires PIN)", callback_data="confirm_delete_all")],
+            [InlineKeyboardButton("❌ NO - Keep My Medicines", callback_data="manage_stock")],
+            [InlineKeyboardButton("📋 Export First (Recommended)", callback_data="export_medicines")]
+        ])
+
+        EXCEL_INSTALL_HINT_TEXT = (
+            "❌ **Excel Support Not Available**\n\n"
+            "Please install: `pip install openpyxl` and restart the bot."
+        )
+
+        UPLOAD_EXCEL_TEXT = """
+📊 **Excel File Upload Ready**
+
+📎 **Now upload your Excel file as a document to this chat.**
+
+📋 **Required format:**
+• **Medicine Name** (required)
+• **Price** (required) 
+• Batch Number (optional)
+• Manufacturing Date (optional)
+• Expiring Date (optional)
+• Dosage Form (optional)
+
+⚙️ **File Requirements:**
+• .xlsx format
+• First row must be column headers
+• Maximum 1000 medicines
+• File size under 20MB
+
+🔄 **The bot will automatically process your file once uploaded!**
+"""
+
+        UPLOAD_EXCEL_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📋 Download Template First", callback_data="download_template")],
+            [InlineKeyboardButton("🔙 Cancel Upload", callback_data="add_bulk_medicine")]
+        ])
+
+        VIEW_ALL_MEDICINES_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📋 View as Text", callback_data="view_text")],
+            [InlineKeyboardButton("📄 Export to Excel", callback_data="export_excel")],
+            [InlineKeyboardButton("🔍 Search Medicine", callback_data="search_medicine")],
+            [InlineKeyboardButton("🔙 Back", callback_data="back_to_main")]
+        ])
+
+        EXPORT_DONE_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📋 View as Text", callback_data="view_text")],
+            [InlineKeyboardButton("🔙 Back to Medicines", callback_data="view_all_medicines")]
+        ])
+
+        UPLOAD_DONE_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📋 View All Medicines", callback_data="view_all_medicines")],
+            [InlineKeyboardButton("📊 Upload More Files", callback_data="add_bulk_medicine")],
+            [InlineKeyboardButton("🏠 Back to Main Menu", callback_data="back_to_main")]
+        ])
+
+        BULK_DELETE_DONE_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📝 Add New Medicine", callback_data="add_medicine")],
+            [InlineKeyboardButton("🏠 Back to Main Menu", callback_data="back_to_main")]
+        ])
+
+        VIEW_TEXT_PAGE_SIZE = 15
+        VIEW_TEXT_PAGE_PREFIX = "view_text:"
+        VIEW_TEXT_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📄 Export to Excel", callback_data="export_excel")],
+            [InlineKeyboardButton("🔍 Search Medicine", callback_data="search_medicine")],
+            [InlineKeyboardButton("🔙 Back", callback_data="view_all_medicines")]
+        ])
+
+        DOWNLOAD_TEMPLATE_TEXT = """
+📋 **Excel Template Download**
+
+📄 **Create an Excel file with these exact column headers:**
+
+```
+Medicine Name | Batch Number | Manufacturing Date | Expiring Date | Dosage Form | Price | Stock Quantity
+```
+
+📝 **Sample Data:**
+```
+Paracetamol   | B001         | 2024-01-15          | 2026-01-15    | Tablet      | 25.50 | 100
+Amoxicillin   | B002         | 2024-02-10          | 2026-02-10    | Capsule     | 45.00 | 50
+Cough Syrup   | B003         | 2024-03-20          | 2025-03-20    | Syrup       | 65.00 | 25
+```
+
+💡 **Tips:**
+• Save as .xlsx file
+• Medicine Name and Price are required
+• Stock Quantity defaults to 0 if not provided
+• Other fields can be left empty
+• Dates should be in YYYY-MM-DD format
+"""
+
+        START_SINGLE_ADD_TEXT = (
+            "📝 **Starting Single Medicine Addition**\n\n"
+            "Please use the command `/add_medicine` to begin the 7-question flow for adding a single medicine."
+        )
+
+        CONFIRM_DELETE_PIN_TEXT = """
+🔐 **Security PIN Required**
+
+🚨 **FINAL CONFIRMATION - Delete ALL Medicines**
+
+To proceed with this dangerous operation, please enter the security PIN:
+
+⚠️ **This will permanently delete ALL medicines from your inventory!**
+
+Type the PIN to confirm (or /cancel to abort):
+"""
+
+        DOWNLOAD_TEMPLATE_MARKUP = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📊 Back to Bulk Add", callback_data="add_bulk_medicine")]
+        ])
+
+        # Bot handlers
+        async def start_command(update: Update, context):
+            """Enhanced start command with comprehensive button interface"""
+            user = update.effective_user
+            telegram_user = await get_or_create_user(user.id, user.first_name, user.last_name, user.username)
+            
+            if not telegram_user:
+                await update.message.reply_text("Sorry, there was an error. Please try again.")
+                return
+            
+            user_type = telegram_user['user_type']
+            role_display = USER_ROLES.get(user_type, user_type.title())
+            
+            welcome_text = f"""
+🏥 **Welcome to Blue Pharma Trading PLC!**
+
+Hello {telegram_user['first_name']}! I'm your comprehensive pharmacy management bot.
+
+👤 **Your Access Level:** {role_display}
+
+💊 **Our Enhanced 7-Field Medicine System:**
+1. Medicine Name
+2. Batch Number  
+3. Manufacturing Date
+4. Expiring Date
+5. Dosage Form
+6. Price (ETB)
+7. Stock Quantity
+
+🎯 **What would you like to do today?**
+Choose from the options below:
+"""
+            
+            # Role-based keyboard
+            reply_markup = ROLE_MARKUPS.get(user_type, CUSTOMER_MARKUP)
+            
+            await update.message.reply_text(
+                welcome_text, 
+                parse_mode='Markdown',
+                reply_markup=reply_markup
+            )
+        
+        async def button_handler(update: Update, context):
+            """Handle all inline button presses"""
+            query = update.callback_query
+            await query.answer()
+            
+            user = query.from_user
+            user_info = await get_or_create_user(user.id, user.first_name, user.last_name, user.username)
+            
+            if not user_info:
+                await edit_message(query, "Error accessing user information. Please try /start")
+                return
+            
+            user_type = user_info['user_type']
+            data = query.data
+            
+            # Route button presses
+            handler = _DISPATCH.get(data)
+            if handler:
+                await handler(query, user_type)
+            else:
+                await edit_message(query, "Feature coming soon! 🚀")
+        
+        # Button handler functions
+        def requires(roles, denied_text="❌ Access denied. Staff/Admin access required."):
+            """Restrict a button handler taking (query, user_type) to the given roles"""
+            def decorator(handler):
+                @functools.wraps(handler)
+                async def wrapper(query, user_type, *args, **kwargs):
+                    if user_type not in roles:
+                        await edit_message(query, denied_text)
+                        return
+                    return await handler(query, user_type, *args, **kwargs)
+                return wrapper
+            return decorator
+        
+        @requires(STAFF_ROLES)
+        async def handle_manage_stock(query, user_type):
+            """Handle stock management button"""
+            try:
+                # Get stock overview
+                total_medicines, total_stock, low_stock, out_of_stock = await asyncio.to_thread(db.get_stock_overview)
+                
+                stock_text = f"""
+📦 **Stock Management Overview**
+
+📊 **Current Status:**
+• Total Medicines: {total_medicines}
+• Total Stock Units: {total_stock:,}
+• Low Stock Items: {low_stock}
+• Out of Stock: {out_of_stock}
+
+🔧 **Available Actions:**
+• Use `/add_medicine` to add new medicines
+• Use `/update_stock` to update quantities
+• Use `/medicines` to view all inventory
+
+💡 **Quick Actions:**
+"""
+                
+                await edit_message(query, stock_text, parse_mode='Markdown', reply_markup=MANAGE_STOCK_MARKUP)
+                
+            except Exception as e:
+                logger.error("Error in stock management: %s", e)
+                await edit_message(query, "Error retrieving stock information.")
+        
+        async def handle_check_medicine(query):
+            """Handle check medicine button"""
+            await edit_message(query, CHECK_MEDICINE_TEXT, parse_mode='Markdown', reply_markup=CHECK_MEDICINE_MARKUP)
+        
+        @requires(STAFF_ROLES)
+        async def handle_add_medicine_button(query, user_type):
+            """Handle add medicine button - Show two options"""
+            await edit_message(query, ADD_MEDICINE_TEXT, parse_mode='Markdown', reply_markup=ADD_MEDICINE_MARKUP)
+        
+        @requires(STAFF_ROLES)
+        async def handle_view_stats(query, user_type):
+            """Handle view statistics button"""
+            try:
+                stats = await asyncio.to_thread(db.get_medicine_stats)
+                total_medicines = stats.get('total_medicines', 0)
+                total_stock = stats.get('total_stock', 0)
+                total_value = stats.get('total_value', 0)
+                avg_price = stats.get('avg_price', 0)
+                top_forms = stats.get('top_dosage_forms', [])
+
+                stats_text = f"""
+📊 **Pharmacy Statistics**
+
+📈 **Inventory Overview:**
+• Total Medicines: {total_medicines}
+• Total Stock Units: {total_stock:,}
+• Total Inventory Value: {total_value:,.2f} ETB
+• Average Medicine Price: {avg_price:.2f} ETB
+
+💊 **Top Dosage Forms:**
+"""
+                
+                for form, count in top_forms:
+                    stats_text += f"• {form}: {count} medicines\n"
+                
+                stats_text += f"\n📅 **Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+                
+                await edit_message(query, stats_text, parse_mode='Markdown', reply_markup=VIEW_STATS_MARKUP)
+                
+            except Exception as e:
+                logger.error("Error in view stats: %s", e)
+                await edit_message(query, "Error retrieving statistics.")
+        
+        @requires(STAFF_ROLES)
+        async def handle_view_orders(query, user_type):
+            """Handle view orders button"""
+            await edit_message(query, VIEW_ORDERS_TEXT, parse_mode='Markdown', reply_markup=VIEW_ORDERS_MARKUP)
+        
+        @requires(STAFF_ROLES)
+        async def handle_update_prices(query, user_type):
+            """Handle update prices button"""
+            await edit_message(query, UPDATE_PRICES_TEXT, parse_mode='Markdown', reply_markup=UPDATE_PRICES_MARKUP)
+        
+        @requires(STAFF_ROLES)
+        async def handle_edit_contact(query, user_type):
+            """Handle edit contact button"""
+            await edit_message(query, EDIT_CONTACT_TEXT, parse_mode='Markdown', reply_markup=EDIT_CONTACT_MARKUP)
+        
+        @requires(ADMIN_ROLES, "❌ Access denied. Administrator access required.")
+        async def handle_manage_users(query, user_type):
+            """Handle manage users button"""
+            await edit_message(query, MANAGE_USERS_TEXT, parse_mode='Markdown', reply_markup=MANAGE_USERS_MARKUP)
+        
+        async def handle_contact_info(query):
+            """Handle contact info button"""
+            await edit_message(query, CONTACT_INFO_TEXT, parse_mode='Markdown', reply_markup=CONTACT_INFO_MARKUP)
+        
+        async def handle_help(query, user_type):
+            """Handle help button"""
+            help_text = HELP_TEXTS.get(user_type) or build_help_text(user_type)
             
-            keyboard = [
-                [InlineKeyboardButton("📎 Upload Excel File", callback_data="upload_excel")],
-                [InlineKeyboardButton("📋 Download Template", callback_data="download_template")],
-                [InlineKeyboardButton("📝 Switch to Single Add", callback_data="add_single_medicine")],
-                [InlineKeyboardButton("🔙 Back to Add Medicine", callback_data="add_medicine")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            await edit_message(query, help_text, parse_mode='Markdown', reply_markup=HELP_MARKUP)
+        
+        # Customer-specific handlers
+        async def handle_place_order(query):
+            """Handle place order button"""
+            await edit_message(query, PLACE_ORDER_TEXT, parse_mode='Markdown', reply_markup=PLACE_ORDER_MARKUP)
+        
+        async def handle_my_orders(query):
+            """Handle my orders button"""
+            await edit_message(query, MY_ORDERS_TEXT, parse_mode='Markdown', reply_markup=MY_ORDERS_MARKUP)
+        
+        async def handle_request_wholesale(query):
+            """Handle request wholesale button"""
+            await edit_message(query, REQUEST_WHOLESALE_TEXT, parse_mode='Markdown', reply_markup=REQUEST_WHOLESALE_MARKUP)
+        
+        # NEW FEATURE HANDLERS
+        
+        @requires(STAFF_ROLES)
+        async def handle_add_single_medicine(query, user_type):
+            """Handle add single medicine button"""
+            await edit_message(query, ADD_SINGLE_MEDICINE_TEXT, parse_mode='Markdown', reply_markup=ADD_SINGLE_MEDICINE_MARKUP)
+        
+        @requires(STAFF_ROLES)
+        async def handle_add_bulk_medicine(query, user_type):
+            """Handle bulk medicine addition via Excel"""
+            if not EXCEL_SUPPORT:
+                await edit_message(query, EXCEL_MISSING_TEXT, parse_mode='Markdown', reply_markup=EXCEL_MISSING_MARKUP)
+                return
             
-            await query.edit_message_text(bulk_text, parse_mode='Markdown', reply_markup=reply_markup)
+            await edit_message(query, ADD_BULK_MEDICINE_TEXT, parse_mode='Markdown', reply_markup=ADD_BULK_MEDICINE_MARKUP)
         
+        @requires(STAFF_ROLES)
         async def handle_low_stock_alert(query, user_type):
             """Handle low stock alert"""
-            if user_type not in ['staff', 'admin']:
-                await query.edit_message_text("❌ Access denied. Staff/Admin access required.")
-                return
-            
             try:
-                medicines = db.get_all_medicines()
-                low_stock_medicines = [med for med in medicines if med['stock_quantity'] <= 10]
-                
-                if not low_stock_medicines:
-                    alert_text = """
-✅ **No Low Stock Items!**
-
-🎉 **Great News:**
-All medicines have sufficient stock levels (>10 units).
-
-📊 **Current Status:**
-• Total medicines monitored: {}
-• Low stock threshold: ≤ 10 units
-• Medicines below threshold: 0
+                # Counts come from one aggregate; only the ten rows shown are fetched
+                total_medicines, _, low_stock_count, _ = await asyncio.to_thread(db.get_stock_overview)
 
-📈 **Keep up the great inventory management!**
-""".format(len(medicines))
+                if not low_stock_count:
+                    alert_text = LOW_STOCK_CLEAR_TEMPLATE.format(total_medicines)
                 else:
-                    alert_text = f"""
-⚠️ **Low Stock Alert** - {len(low_stock_medicines)} items need attention!
+                    parts = [f"""
+⚠️ **Low Stock Alert** - {low_stock_count} items need attention!
 
 🚨 **Medicines Running Low:**
 
-"""
+"""]
                     
-                    for i, med in enumerate(low_stock_medicines[:10], 1):
-                        name = med['name']
+                    for i, med in enumerate(await asyncio.to_thread(db.get_low_stock_items, 10, limit=10), 1):
                         stock = med['stock_quantity']
-                        price = med['price']
                         status = "🔴 OUT OF STOCK" if stock == 0 else f"🟡 {stock} units left"
-                        
-                        alert_text += f"**{i}. {name}**\n"
-                        alert_text += f"{status} | 💰 {price:.2f} ETB\n\n"
+                        parts.append(f"**{i}. {med['name']}**\n{status} | 💰 {med['price']:.2f} ETB\n\n")
                     
-                    if len(low_stock_medicines) > 10:
-                        alert_text += f"_...and {len(low_stock_medicines) - 10} more items_\n\n"
+                    if low_stock_count > 10:
+                        parts.append(f"_...and {low_stock_count - 10} more items_\n\n")
                     
-                    alert_text += f"📈 **Action Required:**\n• Reorder these medicines\n• Update stock levels\n• Monitor regularly"
+                    parts.append("📈 **Action Required:**\n• Reorder these medicines\n• Update stock levels\n• Monitor regularly")
+                    alert_text = "".join(parts)
                 
-                keyboard = [
-                    [InlineKeyboardButton("📈 Update Stock Levels", callback_data="update_stock_levels")],
-                    [InlineKeyboardButton("📝 Add New Stock", callback_data="add_medicine")],
-                    [InlineKeyboardButton("🔙 Back to Stock Management", callback_data="manage_stock")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                await query.edit_message_text(alert_text, parse_mode='Markdown', reply_markup=reply_markup)
+                await edit_message(query, alert_text, parse_mode='Markdown', reply_markup=LOW_STOCK_MARKUP)
                 
             except Exception as e:
-                logger.error(f"Error in low stock alert: {e}")
-                await query.edit_message_text("Error retrieving low stock information.")
+                logger.error("Error in low stock alert: %s", e)
+                await edit_message(query, "Error retrieving low stock information.")
         
+        @requires(STAFF_ROLES)
         async def handle_remove_medicine(query, user_type):
             """Handle remove single medicine"""
-            if user_type not in ['staff', 'admin']:
-                await query.edit_message_text("❌ Access denied. Staff/Admin access required.")
-                return
-            
-            remove_text = """
-🗑️ **Remove Medicine**
-
-⚠️ **How to Remove a Medicine:**
-
-**Step 1:** Find the medicine you want to remove
-• Use `/medicines` to see all medicines
-• Use `/search [name]` to find specific medicine
-
-**Step 2:** Note down the medicine details
-• Medicine name
-• Batch number (if applicable)
-
-**Step 3:** Contact administrator
-• For safety, medicine removal requires manual confirmation
-• This prevents accidental deletions
-
-📞 **Contact Information:**
-• Phone: +251-11-555-0123
-• Email: admin@bluepharma.et
-
-🛡️ **Safety First:** This process ensures inventory integrity and prevents accidental data loss.
-"""
-            
-            keyboard = [
-                [InlineKeyboardButton("📊 View All Medicines", callback_data="view_all_medicines")],
-                [InlineKeyboardButton("🔍 Search Medicine", callback_data="search_medicine")],
-                [InlineKeyboardButton("🗑️ Remove All Medicines", callback_data="remove_all_medicines")],
-                [InlineKeyboardButton("🔙 Back to Stock Management", callback_data="manage_stock")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(remove_text, parse_mode='Markdown', reply_markup=reply_markup)
+            await edit_message(query, REMOVE_MEDICINE_TEXT, parse_mode='Markdown', reply_markup=REMOVE_MEDICINE_MARKUP)
         
+        @requires(STAFF_ROLES)
         async def handle_remove_all_medicines(query, user_type):
             """Handle remove all medicines with confirmation"""
-            if user_type not in ['staff', 'admin']:
-                await query.edit_message_text("❌ Access denied. Staff/Admin access required.")
-                return
-            
             try:
-                medicines = db.get_all_medicines()
-                total_medicines = len(medicines)
-                total_value = sum(med['price'] * med['stock_quantity'] for med in medicines)
-                
-                warning_text = f"""
-⚠️ **DANGER - Remove All Medicines**
-
-🚨 **THIS ACTION CANNOT BE UNDONE!**
-
-📊 **What will be deleted:**
-• **{total_medicines}** medicines
-• **{total_value:,.2f} ETB** total inventory value
-• All medicine records and history
-• All batch and expiry information
-
-🗺️ **Why you might want to do this:**
-• Starting fresh with new inventory
-• System reset for testing
-• Major inventory restructuring
-
-🛠️ **Recommended Alternative:**
-Instead of deleting, consider exporting data first as backup.
-
-⚠️ **Are you absolutely sure you want to delete ALL medicines?**
-"""
+                total_medicines, _, total_value = await asyncio.to_thread(db.get_inventory_summary)
                 
-                keyboard = [
-                    [InlineKeyboardButton("✅ YES - DELETE ALL (Requires PIN)", callback_data="confirm_delete_all")],
-                    [InlineKeyboardButton("❌ NO - Keep My Medicines", callback_data="manage_stock")],
-                    [InlineKeyboardButton("📋 Export First (Recommended)", callback_data="export_medicines")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
+                warning_text = REMOVE_ALL_TEMPLATE.format_map({
+                    'total_medicines': total_medicines,
+                    'total_value': total_value
+                })
                 
-                await query.edit_message_text(warning_text, parse_mode='Markdown', reply_markup=reply_markup)
+                await edit_message(query, warning_text, parse_mode='Markdown', reply_markup=REMOVE_ALL_MARKUP)
                 
             except Exception as e:
-                logger.error(f"Error in remove all medicines: {e}")
-                await query.edit_message_text("Error retrieving medicine information.")
+                logger.error("Error in remove all medicines: %s", e)
+                await edit_message(query, "Error retrieving medicine information.")
         
-        def process_excel_file(file_path):
-            """Process Excel file and return list of medicines"""
-            try:
-                # Read Excel file
-                df = pd.read_excel(file_path)
-                
-                # Expected columns
-                required_columns = ['Medicine Name', 'Price']
-                optional_columns = ['Batch Number', 'Manufacturing Date', 'Expiring Date', 'Dosage Form', 'Stock Quantity']
-                all_expected_columns = required_columns + optional_columns
-                
-                # Check required columns
-                missing_required = [col for col in required_columns if col not in df.columns]
-                if missing_required:
-                    return {'error': f"Missing required columns: {', '.join(missing_required)}"}
-                
-                # Process medicines
-                medicines = []
-                errors = []
-                
-                for index, row in df.iterrows():
-                    try:
-                        # Required fields
-                        name = str(row['Medicine Name']).strip()
-                        print(f"DEBUG: Processing row {index + 2}, Medicine Name: '{name}'")  # Debug line
-                        if not name or name.lower() == 'nan':
-                            errors.append(f"Row {index + 2}: Medicine name is required")
-                            continue
-                        
-                        try:
-                            price = float(row['Price'])
-                            if price < 0:
-                                errors.append(f"Row {index + 2}: Price cannot be negative")
-                                continue
-                        except (ValueError, TypeError):
-                            errors.append(f"Row {index + 2}: Invalid price format")
-                            continue
-                        
-                        # Optional fields
-                        batch_number = str(row.get('Batch Number', '')).strip()
-                        batch_number = None if not batch_number or batch_number.lower() == 'nan' else batch_number
-                        
-                        mfg_date = str(row.get('Manufacturing Date', '')).strip()
-                        mfg_date = None if not mfg_date or mfg_date.lower() == 'nan' else mfg_date
-                        
-                        exp_date = str(row.get('Expiring Date', '')).strip()
-                        exp_date = None if not exp_date or exp_date.lower() == 'nan' else exp_date
-                        
-                        dosage_form = str(row.get('Dosage Form', '')).strip()
-                        dosage_form = None if not dosage_form or dosage_form.lower() == 'nan' else dosage_form
-                        
-                        # Handle stock quantity (optional, defaults to 0)
-                        try:
-                            stock_quantity = int(float(row.get('Stock Quantity', 0)))
-                            if stock_quantity < 0:
-                                errors.append(f"Row {index + 2}: Stock quantity cannot be negative, setting to 0")
-                                stock_quantity = 0
-                        except (ValueError, TypeError):
-                            stock_quantity = 0
-                        
-                        medicine = {
-                            'name': name,
-                            'batch_number': batch_number,
-                            'manufacturing_date': mfg_date,
-                            'expiring_date': exp_date,
-                            'dosage_form': dosage_form,
-                            'price': price,
-                            'stock_quantity': stock_quantity
-                        }
-                        
-                        medicines.append(medicine)
-                        
-                    except Exception as e:
-                        errors.append(f"Row {index + 2}: Error processing row - {str(e)}")
-                
-                if not medicines:
-                    return {'error': 'No valid medicines found in file'}
-                
-                return {
-                    'medicines': medicines,
-                    'errors': errors,
-                    'total_processed': len(medicines)
-                }
-                
-            except Exception as e:
-                return {'error': f'Error reading Excel file: {str(e)}'}
+        # Button routing table; every entry takes (query, user_type)
+        _DISPATCH = {
+            "manage_stock": handle_manage_stock,
+            "check_medicine": lambda q, ut: handle_check_medicine(q),
+            "add_medicine": handle_add_medicine_button,
+            "view_stats": handle_view_stats,
+            "view_orders": handle_view_orders,
+            "update_prices": handle_update_prices,
+            "edit_contact": handle_edit_contact,
+            "manage_users": handle_manage_users,
+            "contact_info": lambda q, ut: handle_contact_info(q),
+            "help": handle_help,
+            "place_order": lambda q, ut: handle_place_order(q),
+            "my_orders": lambda q, ut: handle_my_orders(q),
+            "request_wholesale": lambda q, ut: handle_request_wholesale(q),
+            "add_single_medicine": handle_add_single_medicine,
+            "add_bulk_medicine": handle_add_bulk_medicine,
+            "low_stock_alert": handle_low_stock_alert,
+            "remove_medicine": handle_remove_medicine,
+            "remove_all_medicines": handle_remove_all_medicines,
+        }
         
         # Handle back to main and other common actions
-        async def handle_back_to_main(query):
-            """Handle back to main menu"""
-            user = query.from_user
-            user_info = get_or_create_user(user.id, user.first_name, user.last_name, user.username)
-            
-            if user_info:
-                user_type = user_info['user_type']
-                keyboard = get_user_keyboard(user_type)
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                await query.edit_message_text(
-                    f"🏥 **Welcome back!** Choose an option below:",
-                    parse_mode='Markdown',
-                    reply_markup=reply_markup
-                )
+        async def handle_back_to_main(query, user_type):
+            """Handle back to main menu (user_type is already resolved by the button handler)"""
+            await edit_message(
+                query,
+                BACK_TO_MAIN_TEXT,
+                parse_mode='Markdown',
+                reply_markup=ROLE_MARKUPS.get(user_type, CUSTOMER_MARKUP)
+            )
         
         # Handle view all medicines with two options (Text/Excel)
         async def handle_view_all_medicines(query):
             """Handle view all medicines - Show two options"""
             try:
-                medicines = db.get_all_medicines()
-                total_medicines = len(medicines)
-                total_stock = sum(med['stock_quantity'] for med in medicines)
-                total_value = sum(med['price'] * med['stock_quantity'] for med in medicines)
+                total_medicines, total_stock, total_value = await asyncio.to_thread(db.get_inventory_summary)
                 
                 view_text = f"""
 📊 **View All Medicines**
@@ -1144,19 +1491,11 @@ Instead of deleting, consider exporting data first as backup.
 • Downloadable .xlsx file
 """
                 
-                keyboard = [
-                    [InlineKeyboardButton("📋 View as Text", callback_data="view_text")],
-                    [InlineKeyboardButton("📄 Export to Excel", callback_data="export_excel")],
-                    [InlineKeyboardButton("🔍 Search Medicine", callback_data="search_medicine")],
-                    [InlineKeyboardButton("🔙 Back", callback_data="back_to_main")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                await query.edit_message_text(view_text, parse_mode='Markdown', reply_markup=reply_markup)
+                await edit_message(query, view_text, parse_mode='Markdown', reply_markup=VIEW_ALL_MEDICINES_MARKUP)
                 
             except Exception as e:
-                logger.error(f"Error in view all medicines: {e}")
-                await query.edit_message_text("Error retrieving medicines information.")
+                logger.error("Error in view all medicines: %s", e)
+                await edit_message(query, "Error retrieving medicines information.")
         
         # Enhanced button handler with routing
         async def enhanced_button_handler(update: Update, context):
@@ -1165,159 +1504,32 @@ Instead of deleting, consider exporting data first as backup.
             await query.answer()
             
             user = query.from_user
-            user_info = get_or_create_user(user.id, user.first_name, user.last_name, user.username)
+            user_info = await get_or_create_user(user.id, user.first_name, user.last_name, user.username)
             
             if not user_info:
-                await query.edit_message_text("Error accessing user information. Please try /start")
+                await edit_message(query, "Error accessing user information. Please try /start")
                 return
             
             user_type = user_info['user_type']
             data = query.data
             
             # Route ALL button presses with user_type
-            if data == "back_to_main":
-                await handle_back_to_main(query)
-            elif data == "view_all_medicines":
-                await handle_view_all_medicines(query)
-            elif data == "manage_stock":
-                await handle_manage_stock(query, user_type)
-            elif data == "check_medicine":
-                await handle_check_medicine(query)
-            elif data == "add_medicine":
-                await handle_add_medicine_button(query, user_type)
-            elif data == "view_stats":
-                await handle_view_stats(query, user_type)
-            elif data == "view_orders":
-                await handle_view_orders(query, user_type)
-            elif data == "update_prices":
-                await handle_update_prices(query, user_type)
-            elif data == "edit_contact":
-                await handle_edit_contact(query, user_type)
-            elif data == "manage_users":
-                await handle_manage_users(query, user_type)
-            elif data == "contact_info":
-                await handle_contact_info(query)
-            elif data == "help":
-                await handle_help(query, user_type)
-            elif data == "place_order":
-                await handle_place_order(query)
-            elif data == "my_orders":
-                await handle_my_orders(query)
-            elif data == "request_wholesale":
-                await handle_request_wholesale(query)
-            elif data == "add_single_medicine":
-                await handle_add_single_medicine(query, user_type)
-            elif data == "add_bulk_medicine":
-                await handle_add_bulk_medicine(query, user_type)
-            elif data == "low_stock_alert":
-                await handle_low_stock_alert(query, user_type)
-            elif data == "remove_medicine":
-                await handle_remove_medicine(query, user_type)
-            elif data == "remove_all_medicines":
-                await handle_remove_all_medicines(query, user_type)
-            elif data == "start_single_add":
-                # Start the single medicine conversation via callback
-                await query.edit_message_text(
-                    "📝 **Starting Single Medicine Addition**\n\n"
-                    "Please use the command `/add_medicine` to begin the 7-question flow for adding a single medicine."
-                )
-            elif data == "upload_excel":
-                if not EXCEL_SUPPORT:
-                    await query.edit_message_text(
-                        "❌ **Excel Support Not Available**\n\n"
-                        "Please install: `pip install pandas openpyxl` and restart the bot."
-                    )
-                    return
-                
-                # Store user ID for file upload tracking
-                user_data[query.from_user.id] = {'awaiting_excel': True}
-                
-                upload_text = """
-📊 **Excel File Upload Ready**
-
-📎 **Now upload your Excel file as a document to this chat.**
-
-📋 **Required format:**
-• **Medicine Name** (required)
-• **Price** (required) 
-• Batch Number (optional)
-• Manufacturing Date (optional)
-• Expiring Date (optional)
-• Dosage Form (optional)
-
-⚙️ **File Requirements:**
-• .xlsx or .xls format
-• First row must be column headers
-• Maximum 1000 medicines
-• File size under 20MB
-
-🔄 **The bot will automatically process your file once uploaded!**
-"""
-                
-                keyboard = [
-                    [InlineKeyboardButton("📋 Download Template First", callback_data="download_template")],
-                    [InlineKeyboardButton("🔙 Cancel Upload", callback_data="add_bulk_medicine")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                await query.edit_message_text(upload_text, parse_mode='Markdown', reply_markup=reply_markup)
-            elif data == "download_template":
-                template_text = """
-📋 **Excel Template Download**
-
-📄 **Create an Excel file with these exact column headers:**
-
-```
-Medicine Name | Batch Number | Manufacturing Date | Expiring Date | Dosage Form | Price | Stock Quantity
-```
-
-📝 **Sample Data:**
-```
-Paracetamol   | B001         | 2024-01-15          | 2026-01-15    | Tablet      | 25.50 | 100
-Amoxicillin   | B002         | 2024-02-10          | 2026-02-10    | Capsule     | 45.00 | 50
-Cough Syrup   | B003         | 2024-03-20          | 2025-03-20    | Syrup       | 65.00 | 25
-```
-
-💡 **Tips:**
-• Save as .xlsx or .xls file
-• Medicine Name and Price are required
-• Stock Quantity defaults to 0 if not provided
-• Other fields can be left empty
-• Dates should be in YYYY-MM-DD format
-"""
-                keyboard = [
-                    [InlineKeyboardButton("📊 Back to Bulk Add", callback_data="add_bulk_medicine")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                await query.edit_message_text(template_text, parse_mode='Markdown', reply_markup=reply_markup)
-            elif data == "view_text":
-                await handle_view_text(query)
-            elif data == "export_excel":
-                await handle_export_excel(query, context)
-            elif data == "export_medicines":
-                await handle_export_excel(query, context)
-            elif data == "confirm_delete_all":
-                # Start PIN verification process
-                user_data[query.from_user.id] = {'awaiting_pin': True}
-                pin_text = """
-🔐 **Security PIN Required**
-
-🚨 **FINAL CONFIRMATION - Delete ALL Medicines**
-
-To proceed with this dangerous operation, please enter the security PIN:
-
-⚠️ **This will permanently delete ALL medicines from your inventory!**
-
-Type the PIN to confirm (or /cancel to abort):
-"""
-                await query.edit_message_text(pin_text, parse_mode='Markdown')
+            handler = _CALLBACK_ROUTES.get(data)
+            if handler:
+                await handler(query, user_type)
+            elif data in _CONTEXT_CALLBACK_ROUTES:
+                await _CONTEXT_CALLBACK_ROUTES[data](query, context)
+            elif data.startswith(VIEW_TEXT_PAGE_PREFIX):
+                after_id, _, first_number = data[len(VIEW_TEXT_PAGE_PREFIX):].partition(':')
+                await handle_view_text(query, int(after_id), int(first_number))
             else:
-                await query.edit_message_text("Feature coming soon! 🚀")
+                await edit_message(query, "Feature coming soon! 🚀")
         
         # Command handlers
         async def medicines_command(update: Update, context):
             """Show all medicines"""
             try:
-                medicines = db.get_all_medicines(15)
+                medicines = (await cached_medicines())[:15]
                 
                 if not medicines:
                     await update.message.reply_text(
@@ -1325,29 +1537,28 @@ Type the PIN to confirm (or /cancel to abort):
                     )
                     return
                 
-                message = "💊 **Complete Medicine Inventory:**\n\n"
+                parts = ["💊 **Complete Medicine Inventory:**\n\n"]
                 
                 total_value = 0
                 for i, med in enumerate(medicines, 1):
-                    name = med['name']
                     price = med['price']
                     stock = med['stock_quantity']
-                    dosage_form = med['dosage_form'] or "N/A"
-                    batch = med['batch_number'] or "N/A"
-                    
                     stock_info = f"✅ {stock} units" if stock > 0 else "❌ Out of Stock"
                     total_value += price * stock
                     
-                    message += f"**{i}. {name}**\n"
-                    message += f"💰 {price:.2f} ETB | 📦 {stock_info}\n"
-                    message += f"💊 {dosage_form} | 🏷️ {batch}\n\n"
+                    parts.append(
+                        f"**{i}. {med['name']}**\n"
+                        f"💰 {price:.2f} ETB | 📦 {stock_info}\n"
+                        f"💊 {med['dosage_form'] or 'N/A'} | 🏷️ {med['batch_number'] or 'N/A'}\n\n"
+                    )
                 
-                message += f"📊 **Summary:** {len(medicines)} medicines, Total value: {total_value:.2f} ETB"
+                parts.append(f"📊 **Summary:** {len(medicines)} medicines, Total value: {total_value:.2f} ETB")
+                message = "".join(parts)
                 
                 await update.message.reply_text(message, parse_mode='Markdown')
                 
             except Exception as e:
-                logger.error(f"Error showing medicines: {e}")
+                logger.error("Error showing medicines: %s", e)
                 await update.message.reply_text("Error retrieving medicines.")
         
         async def search_command(update: Update, context):
@@ -1361,7 +1572,7 @@ Type the PIN to confirm (or /cancel to abort):
                 return
             
             search_term = " ".join(context.args)
-            medicines = db.search_medicines(search_term, limit=5)
+            medicines = await asyncio.to_thread(db.search_medicines, search_term, limit=5)
             
             if not medicines:
                 await update.message.reply_text(
@@ -1390,13 +1601,13 @@ Type the PIN to confirm (or /cancel to abort):
         async def add_medicine_start(update: Update, context):
             """Start add medicine conversation"""
             user_id = update.effective_user.id
-            user_info = get_or_create_user(user_id, update.effective_user.first_name)
+            user_info = await get_or_create_user(user_id, update.effective_user.first_name)
             
-            if not user_info or user_info['user_type'] not in ['staff', 'admin']:
+            if not user_info or user_info['user_type'] not in STAFF_ROLES:
                 await update.message.reply_text("❌ Access denied. Staff/Admin access required.")
                 return ConversationHandler.END
             
-            user_data[user_id] = {}
+            user_data.session(user_id)['new_medicine'] = {}
             
             await update.message.reply_text(
                 "📝 **Add Medicine - 7-Question Flow**\n\n"
@@ -1404,100 +1615,112 @@ Type the PIN to confirm (or /cancel to abort):
             )
             return MEDICINE_NAME
         
+        async def add_medicine_expired(update: Update, user_id):
+            """End an add-medicine conversation whose answers expired with the user's session"""
+            user_data.clear_flow(user_id, 'new_medicine')
+            await update.message.reply_text(
+                "⌛ This add-medicine session has expired.\n\n"
+                "Send /add_medicine to start again."
+            )
+            return ConversationHandler.END
+        
         async def handle_medicine_name(update: Update, context):
             """Handle medicine name input"""
             user_id = update.effective_user.id
+            draft = user_data.session(user_id).get('new_medicine')
+            if draft is None:
+                return await add_medicine_expired(update, user_id)
             medicine_name = update.message.text.strip()
             
             if len(medicine_name) < 2:
                 await update.message.reply_text("❌ Medicine name too short. Please enter a valid name:")
                 return MEDICINE_NAME
             
-            user_data[user_id]['name'] = medicine_name
+            draft['name'] = medicine_name
             
-            await update.message.reply_text(
-                f"✅ Medicine Name: {medicine_name}\n\n"
-                "**Question 2/7:** What is the batch number?\n"
-                "(Enter 'skip' if not available)"
-            )
+            await update.message.reply_text(ADD_MEDICINE_PROMPTS[BATCH_NUMBER].format_map({'value': medicine_name}))
             return BATCH_NUMBER
         
         async def handle_batch_number(update: Update, context):
             """Handle batch number input"""
             user_id = update.effective_user.id
+            draft = user_data.session(user_id).get('new_medicine')
+            if draft is None:
+                return await add_medicine_expired(update, user_id)
             batch_number = update.message.text.strip()
             
-            if batch_number.lower() == 'skip':
+            if _SKIP_RE.match(batch_number):
                 batch_number = None
             
-            user_data[user_id]['batch_number'] = batch_number
+            draft['batch_number'] = batch_number
             
             batch_display = batch_number if batch_number else "Not provided"
-            await update.message.reply_text(
-                f"✅ Batch Number: {batch_display}\n\n"
-                "**Question 3/7:** Manufacturing date (YYYY-MM-DD)?\n"
-                "(Enter 'skip' if not available)"
-            )
+            await update.message.reply_text(ADD_MEDICINE_PROMPTS[MANUFACTURING_DATE].format_map({'value': batch_display}))
             return MANUFACTURING_DATE
         
         async def handle_manufacturing_date(update: Update, context):
             """Handle manufacturing date input"""
             user_id = update.effective_user.id
+            draft = user_data.session(user_id).get('new_medicine')
+            if draft is None:
+                return await add_medicine_expired(update, user_id)
             mfg_date = update.message.text.strip()
             
-            if mfg_date.lower() == 'skip':
+            if _SKIP_RE.match(mfg_date):
                 mfg_date = None
+            elif not _is_iso_date(mfg_date):
+                await update.message.reply_text("❌ Please enter the date as YYYY-MM-DD (or 'skip'):")
+                return MANUFACTURING_DATE
             
-            user_data[user_id]['manufacturing_date'] = mfg_date
+            draft['manufacturing_date'] = mfg_date
             
             date_display = mfg_date if mfg_date else "Not provided"
-            await update.message.reply_text(
-                f"✅ Manufacturing Date: {date_display}\n\n"
-                "**Question 4/7:** Expiring date (YYYY-MM-DD)?\n"
-                "(Enter 'skip' if not available)"
-            )
+            await update.message.reply_text(ADD_MEDICINE_PROMPTS[EXPIRING_DATE].format_map({'value': date_display}))
             return EXPIRING_DATE
         
         async def handle_expiring_date(update: Update, context):
             """Handle expiring date input"""
             user_id = update.effective_user.id
+            draft = user_data.session(user_id).get('new_medicine')
+            if draft is None:
+                return await add_medicine_expired(update, user_id)
             exp_date = update.message.text.strip()
             
-            if exp_date.lower() == 'skip':
+            if _SKIP_RE.match(exp_date):
                 exp_date = None
+            elif not _is_iso_date(exp_date):
+                await update.message.reply_text("❌ Please enter the date as YYYY-MM-DD (or 'skip'):")
+                return EXPIRING_DATE
             
-            user_data[user_id]['expiring_date'] = exp_date
+            draft['expiring_date'] = exp_date
             
             date_display = exp_date if exp_date else "Not provided"
-            await update.message.reply_text(
-                f"✅ Expiring Date: {date_display}\n\n"
-                "**Question 5/7:** Dosage form?\n"
-                "Examples: Tablet, Capsule, Syrup, Injection, etc.\n"
-                "(Enter 'skip' if not available)"
-            )
+            await update.message.reply_text(ADD_MEDICINE_PROMPTS[DOSAGE_FORM].format_map({'value': date_display}))
             return DOSAGE_FORM
         
         async def handle_dosage_form(update: Update, context):
             """Handle dosage form input"""
             user_id = update.effective_user.id
+            draft = user_data.session(user_id).get('new_medicine')
+            if draft is None:
+                return await add_medicine_expired(update, user_id)
             dosage_form = update.message.text.strip()
             
-            if dosage_form.lower() == 'skip':
+            if _SKIP_RE.match(dosage_form):
                 dosage_form = None
             
-            user_data[user_id]['dosage_form'] = dosage_form
+            draft['dosage_form'] = dosage_form
             
             form_display = dosage_form if dosage_form else "Not specified"
-            await update.message.reply_text(
-                f"✅ Dosage Form: {form_display}\n\n"
-                "**Question 6/7:** Price in ETB?\n"
-                "Example: 25.50"
-            )
+            await update.message.reply_text(ADD_MEDICINE_PROMPTS[PRICE].format_map({'value': form_display}))
             return PRICE
         
         async def handle_price(update: Update, context):
             """Handle price input and continue to stock quantity"""
             user_id = update.effective_user.id
+            draft = user_data.session(user_id).get('new_medicine')
+            if draft is None:
+                return await add_medicine_expired(update, user_id)
             
             try:
                 price = float(update.message.text.strip())
@@ -1507,19 +1730,17 @@ Type the PIN to confirm (or /cancel to abort):
                 await update.message.reply_text("❌ Please enter a valid price:")
                 return PRICE
             
-            user_data[user_id]['price'] = price
+            draft['price'] = price
             
-            await update.message.reply_text(
-                f"✅ Price: {price:.2f} ETB\n\n"
-                "**Question 7/7:** How many units are in stock?\n"
-                "Example: 100\n"
-                "(Enter 0 if no stock available yet)"
-            )
+            await update.message.reply_text(ADD_MEDICINE_PROMPTS[STOCK_QUANTITY].format_map({'value': price}))
             return STOCK_QUANTITY
         
         async def handle_stock_quantity(update: Update, context):
             """Handle stock quantity input and save medicine"""
             user_id = update.effective_user.id
+            draft = user_data.session(user_id).get('new_medicine')
+            if draft is None:
+                return await add_medicine_expired(update, user_id)
             
             try:
                 stock_quantity = int(update.message.text.strip())
@@ -1529,12 +1750,13 @@ Type the PIN to confirm (or /cancel to abort):
                 await update.message.reply_text("❌ Please enter a valid stock quantity (whole number):")
                 return STOCK_QUANTITY
             
-            user_data[user_id]['stock_quantity'] = stock_quantity
+            draft['stock_quantity'] = stock_quantity
             
             # Save medicine
             try:
-                medicine_data = user_data[user_id]
-                medicine_id = db.add_medicine(
+                medicine_data = draft
+                medicine_id = await asyncio.to_thread(
+                    db.add_medicine,
                     name=medicine_data['name'],
                     batch_number=medicine_data.get('batch_number'),
                     manufacturing_date=medicine_data.get('manufacturing_date'),
@@ -1543,6 +1765,7 @@ Type the PIN to confirm (or /cancel to abort):
                     price=medicine_data['price'],
                     stock_quantity=medicine_data['stock_quantity']
                 )
+                invalidate_medicines_cache()
                 
                 if medicine_id:
                     summary = f"""
@@ -1562,8 +1785,7 @@ Type the PIN to confirm (or /cancel to abort):
                     await update.message.reply_text(summary, parse_mode='Markdown')
                     
                     # Clean up
-                    if user_id in user_data:
-                        del user_data[user_id]
+                    user_data.clear_flow(user_id, 'new_medicine')
                     
                     return ConversationHandler.END
                 else:
@@ -1571,15 +1793,14 @@ Type the PIN to confirm (or /cancel to abort):
                     return ConversationHandler.END
                     
             except Exception as e:
-                logger.error(f"Error saving medicine: {e}")
+                logger.error("Error saving medicine: %s", e)
                 await update.message.reply_text("❌ Error saving medicine.")
                 return ConversationHandler.END
         
         async def cancel_add_medicine(update: Update, context):
             """Cancel add medicine conversation"""
             user_id = update.effective_user.id
-            if user_id in user_data:
-                del user_data[user_id]
+            user_data.clear_flow(user_id, 'new_medicine')
             
             await update.message.reply_text("❌ Add medicine cancelled.")
             return ConversationHandler.END
@@ -1587,10 +1808,10 @@ Type the PIN to confirm (or /cancel to abort):
         async def handle_document(update: Update, context):
             """Handle document uploads (Excel files)"""
             user_id = update.effective_user.id
-            user_info = get_or_create_user(user_id, update.effective_user.first_name)
+            user_info = await get_or_create_user(user_id, update.effective_user.first_name)
             
             # Check if user has staff/admin access
-            if not user_info or user_info['user_type'] not in ['staff', 'admin']:
+            if not user_info or user_info['user_type'] not in STAFF_ROLES:
                 await update.message.reply_text("❌ Access denied. Staff/Admin access required for file uploads.")
                 return
             
@@ -1607,16 +1828,18 @@ Type the PIN to confirm (or /cancel to abort):
             
             document = update.message.document
             
-            # Validate file type
-            if not document.file_name.lower().endswith(('.xlsx', '.xls')):
+            # Validate file type from the message metadata, before anything is downloaded.
+            # openpyxl only reads .xlsx, so legacy .xls files are turned away here too.
+            if not ((document.file_name or '').lower().endswith('.xlsx') or document.mime_type == XLSX_MIME_TYPE):
                 await update.message.reply_text(
                     "❌ **Invalid File Type**\n\n"
-                    "Please upload an Excel file (.xlsx or .xls format only)."
+                    "Please upload an Excel file (.xlsx format only).\n"
+                    "Older .xls files can be re-saved as .xlsx from Excel."
                 )
                 return
             
             # Check file size (20MB limit)
-            if document.file_size > 20 * 1024 * 1024:
+            if (document.file_size or 0) > 20 * 1024 * 1024:
                 await update.message.reply_text(
                     "❌ **File Too Large**\n\n"
                     "Please upload a file smaller than 20MB."
@@ -1624,10 +1847,7 @@ Type the PIN to confirm (or /cancel to abort):
                 return
             
             if not EXCEL_SUPPORT:
-                await update.message.reply_text(
-                    "❌ **Excel Support Not Available**\n\n"
-                    "Please install: `pip install pandas openpyxl` and restart the bot."
-                )
+                await update.message.reply_text(EXCEL_INSTALL_HINT_TEXT)
                 return
             
             # Send processing message
@@ -1642,20 +1862,16 @@ Type the PIN to confirm (or /cancel to abort):
                 # Download the file
                 file = await context.bot.get_file(document.file_id)
                 
-                # Create temporary file
-                with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as temp_file:
-                    temp_path = temp_file.name
-                    await file.download_to_drive(temp_path)
+                # Keep the upload in memory; Telegram caps bot downloads at 20MB
+                excel_buffer = io.BytesIO()
+                await file.download_to_memory(excel_buffer)
+                excel_buffer.seek(0)
                 
-                # Process the Excel file
-                result = process_excel_file(temp_path)
-                
-                # Clean up temporary file
-                os.unlink(temp_path)
+                # Process the Excel file in a worker process so other chats keep being served
+                result = await run_excel_job(process_excel_file, excel_buffer)
                 
                 # Clear awaiting status
-                if user_id in user_data:
-                    user_data[user_id]['awaiting_excel'] = False
+                user_data.clear_flow(user_id, 'awaiting_excel')
                 
                 if 'error' in result:
                     await processing_msg.edit_text(
@@ -1671,30 +1887,10 @@ Type the PIN to confirm (or /cancel to abort):
                 medicines = result['medicines']
                 errors = result.get('errors', [])
                 
-                # Add medicines to database
-                added_count = 0
-                failed_count = 0
-                
-                for medicine in medicines:
-                    try:
-                        medicine_id = db.add_medicine(
-                            name=medicine['name'],
-                            batch_number=medicine['batch_number'],
-                            manufacturing_date=medicine['manufacturing_date'],
-                            expiring_date=medicine['expiring_date'],
-                            dosage_form=medicine['dosage_form'],
-                            price=medicine['price'],
-                            stock_quantity=medicine['stock_quantity']
-                        )
-                        
-                        if medicine_id:
-                            added_count += 1
-                        else:
-                            failed_count += 1
-                            
-                    except Exception as e:
-                        failed_count += 1
-                        errors.append(f"Database error for {medicine['name']}: {str(e)}")
+                # Add medicines to database in one transaction; rows the database rejects count as failed
+                added_count = await asyncio.to_thread(db.add_medicines_bulk, medicines)
+                invalidate_medicines_cache()
+                failed_count = len(medicines) - added_count
                 
                 # Prepare summary message (plain text to avoid markdown parsing issues)
                 summary = f"✅ Excel Processing Complete!\n\n"
@@ -1709,34 +1905,22 @@ Type the PIN to confirm (or /cancel to abort):
                     summary += f"\n⚠️ Errors encountered:\n"
                     for i, error in enumerate(errors[:5], 1):
                         # Escape problematic characters
-                        clean_error = str(error).replace('*', '').replace('_', '').replace('[', '').replace(']', '')
+                        clean_error = str(error).translate(MARKDOWN_STRIP_TABLE)
                         summary += f"• {clean_error}\n"
                     if len(errors) > 5:
                         summary += f"• ...and {len(errors) - 5} more errors\n"
                 
                 summary += f"\n🎉 Success! Your medicines have been added to the inventory."
+                summary += f"\n\n🎯 What would you like to do next?"
                 
-                await processing_msg.edit_text(summary)
-                
-                # Send additional success message with options
-                keyboard = [
-                    [InlineKeyboardButton("📋 View All Medicines", callback_data="view_all_medicines")],
-                    [InlineKeyboardButton("📊 Upload More Files", callback_data="add_bulk_medicine")],
-                    [InlineKeyboardButton("🏠 Back to Main Menu", callback_data="back_to_main")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                await update.message.reply_text(
-                    "🎯 **What would you like to do next?**",
-                    reply_markup=reply_markup
-                )
+                # One edit carries both the summary and the next-step options
+                await processing_msg.edit_text(summary, reply_markup=UPLOAD_DONE_MARKUP)
                 
             except Exception as e:
-                logger.error(f"Error processing Excel file: {e}")
+                logger.error("Error processing Excel file: %s", e)
                 
                 # Clean up user data
-                if user_id in user_data:
-                    user_data[user_id]['awaiting_excel'] = False
+                user_data.clear_flow(user_id, 'awaiting_excel')
                 
                 await processing_msg.edit_text(
                     f"❌ **Processing Error**\n\n"
@@ -1746,64 +1930,67 @@ Type the PIN to confirm (or /cancel to abort):
         
         # NEW HANDLER FUNCTIONS FOR VIEW TEXT AND EXCEL EXPORT
         
-        async def handle_view_text(query):
-            """Handle view medicines as text in chat"""
+        async def handle_view_text(query, after_id=0, first_number=1):
+            """Handle view medicines as text in chat, one page of VIEW_TEXT_PAGE_SIZE at a time"""
             try:
-                medicines = db.get_all_medicines(15)
+                # Fetch one extra row to learn whether a next page exists
+                medicines = await asyncio.to_thread(db.get_medicines_page, after_id, VIEW_TEXT_PAGE_SIZE + 1)
+                has_next = len(medicines) > VIEW_TEXT_PAGE_SIZE
+                medicines = medicines[:VIEW_TEXT_PAGE_SIZE]
                 
                 if not medicines:
-                    await query.edit_message_text("📦 No medicines in inventory.")
+                    await edit_message(query, "📦 No medicines in inventory.")
                     return
                 
-                message = "💊 **Complete Medicine Inventory (Text View):**\n\n"
+                parts = ["💊 **Complete Medicine Inventory (Text View):**\n\n"]
                 
                 total_value = 0
-                for i, med in enumerate(medicines, 1):
-                    name = med['name']
+                for i, med in enumerate(medicines, first_number):
                     price = med['price']
                     stock = med['stock_quantity']
-                    dosage_form = med['dosage_form'] or "N/A"
-                    batch = med['batch_number'] or "N/A"
-                    mfg_date = med['manufacturing_date'] or "N/A"
-                    exp_date = med['expiring_date'] or "N/A"
-                    
                     stock_info = f"✅ {stock} units" if stock > 0 else "❌ Out of Stock"
                     total_value += price * stock
                     
-                    message += f"**{i}. {name}**\n"
-                    message += f"💰 {price:.2f} ETB | 📦 {stock_info}\n"
-                    message += f"💊 {dosage_form} | 🏷️ {batch}\n"
-                    message += f"📅 Mfg: {mfg_date} | Exp: {exp_date}\n\n"
-                
-                message += f"📊 **Summary:** {len(medicines)} medicines, Total value: {total_value:.2f} ETB\n\n"
-                
-                if len(medicines) == 15:
-                    message += "_Showing first 15 medicines. Use Excel export for complete list._"
+                    parts.append(
+                        f"**{i}. {med['name']}**\n"
+                        f"💰 {price:.2f} ETB | 📦 {stock_info}\n"
+                        f"💊 {med['dosage_form'] or 'N/A'} | 🏷️ {med['batch_number'] or 'N/A'}\n"
+                        f"📅 Mfg: {med['manufacturing_date'] or 'N/A'} | Exp: {med['expiring_date'] or 'N/A'}\n\n"
+                    )
                 
-                keyboard = [
-                    [InlineKeyboardButton("📄 Export to Excel", callback_data="export_excel")],
-                    [InlineKeyboardButton("🔍 Search Medicine", callback_data="search_medicine")],
-                    [InlineKeyboardButton("🔙 Back", callback_data="view_all_medicines")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
+                parts.append(f"📊 **Summary:** {len(medicines)} medicines, Total value: {total_value:.2f} ETB\n\n")
+                
+                if has_next:
+                    parts.append("_More medicines on the next page. Use Excel export for complete list._")
+                message = "".join(parts)
+                
+                if has_next or after_id:
+                    # Page links carry the last medicine's id and the next item number
+                    nav = []
+                    if after_id:
+                        nav.append(InlineKeyboardButton("⏮️ First Page", callback_data="view_text"))
+                    if has_next:
+                        next_data = f"{VIEW_TEXT_PAGE_PREFIX}{medicines[-1]['id']}:{first_number + len(medicines)}"
+                        nav.append(InlineKeyboardButton("▶️ Next Page", callback_data=next_data))
+                    reply_markup = InlineKeyboardMarkup([nav, *VIEW_TEXT_MARKUP.inline_keyboard])
+                else:
+                    reply_markup = VIEW_TEXT_MARKUP
                 
-                await query.edit_message_text(message, parse_mode='Markdown', reply_markup=reply_markup)
+                await edit_message(query, message, parse_mode='Markdown', reply_markup=reply_markup)
                 
             except Exception as e:
-                logger.error(f"Error in view text: {e}")
-                await query.edit_message_text("Error retrieving medicines.")
+                logger.error("Error in view text: %s", e)
+                await edit_message(query, "Error retrieving medicines.")
         
         async def handle_export_excel(query, context):
             """Handle Excel export of all medicines"""
             try:
                 if not EXCEL_SUPPORT:
-                    await query.edit_message_text(
-                        "❌ **Excel Support Not Available**\n\n"
-                        "Please install: `pip install pandas openpyxl` and restart the bot."
-                    )
+                    await edit_message(query, EXCEL_INSTALL_HINT_TEXT)
                     return
                 
-                # Show processing message
+                # Show processing message; later edits go through processing_msg, so drop the tracked view
+                _last_views.pop(query.message.chat_id, None)
                 processing_msg = await query.edit_message_text(
                     "⏳ **Generating Excel Export...**\n\n"
                     "🗺️ Processing all medicines\n"
@@ -1812,53 +1999,17 @@ Type the PIN to confirm (or /cancel to abort):
                 )
                 
                 # Get all medicines
-                medicines = db.get_all_medicines()
+                medicines = await cached_medicines()
                 
                 if not medicines:
                     await processing_msg.edit_text("📦 No medicines to export.")
                     return
                 
-                # Create DataFrame with 7-field system
-                data = []
-                for med in medicines:
-                    data.append({
-                        'Medicine Name': med['name'],
-                        'Batch Number': med['batch_number'] or '',
-                        'Manufacturing Date': med['manufacturing_date'] or '',
-                        'Expiring Date': med['expiring_date'] or '',
-                        'Dosage Form': med['dosage_form'] or '',
-                        'Price (ETB)': med['price'],
-                        'Stock Quantity': med['stock_quantity']
-                    })
-                
-                df = pd.DataFrame(data)
-                
-                # Create temporary Excel file
+                # Build the Excel file in memory
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
                 filename = f"BluePharma_Inventory_{timestamp}.xlsx"
                 
-                with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as temp_file:
-                    temp_path = temp_file.name
-                    
-                    # Create Excel with formatting
-                    with pd.ExcelWriter(temp_path, engine='openpyxl') as writer:
-                        df.to_excel(writer, sheet_name='Medicines Inventory', index=False)
-                        
-                        # Get worksheet for formatting
-                        worksheet = writer.sheets['Medicines Inventory']
-                        
-                        # Auto-adjust column widths
-                        for column in worksheet.columns:
-                            max_length = 0
-                            column_letter = column[0].column_letter
-                            for cell in column:
-                                try:
-                                    if len(str(cell.value)) > max_length:
-                                        max_length = len(str(cell.value))
-                                except:
-                                    pass
-                            adjusted_width = min(max_length + 2, 50)
-                            worksheet.column_dimensions[column_letter].width = adjusted_width
+                excel_bytes = await run_excel_job(write_inventory_workbook, inventory_export_rows(medicines))
                 
                 # Send the file
                 total_medicines = len(medicines)
@@ -1874,16 +2025,12 @@ Type the PIN to confirm (or /cancel to abort):
                 caption += f"💾 File: {filename}"
                 
                 # Send document
-                with open(temp_path, 'rb') as excel_file:
-                    await context.bot.send_document(
-                        chat_id=query.message.chat_id,
-                        document=excel_file,
-                        filename=filename,
-                        caption=caption
-                    )
-                
-                # Clean up temporary file
-                os.unlink(temp_path)
+                await context.bot.send_document(
+                    chat_id=query.message.chat_id,
+                    document=excel_bytes,
+                    filename=filename,
+                    caption=caption
+                )
                 
                 # Update the message with success info
                 success_text = f"✅ **Excel Export Complete!**\n\n"
@@ -1892,25 +2039,71 @@ Type the PIN to confirm (or /cancel to abort):
                 success_text += f"🗺️ **7-Field Data:** Complete inventory\n\n"
                 success_text += f"💾 The Excel file has been sent above. You can download and open it with Excel, Google Sheets, or any spreadsheet application."
                 
-                keyboard = [
-                    [InlineKeyboardButton("📋 View as Text", callback_data="view_text")],
-                    [InlineKeyboardButton("🔙 Back to Medicines", callback_data="view_all_medicines")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                await processing_msg.edit_text(success_text, reply_markup=reply_markup)
+                await processing_msg.edit_text(success_text, reply_markup=EXPORT_DONE_MARKUP)
                 
             except Exception as e:
-                logger.error(f"Error in Excel export: {e}")
-                await query.edit_message_text(f"Error creating Excel export: {str(e)}")
+                logger.error("Error in Excel export: %s", e)
+                await edit_message(query, f"Error creating Excel export: {str(e)}")
+        
+        # Callback routing for enhanced_button_handler
+        async def handle_start_single_add(query, user_type):
+            """Point the user at the /add_medicine conversation"""
+            await edit_message(query, START_SINGLE_ADD_TEXT)
+        
+        async def handle_upload_excel(query, user_type):
+            """Arm the chat for an Excel upload"""
+            if not EXCEL_SUPPORT:
+                await edit_message(query, EXCEL_INSTALL_HINT_TEXT)
+                return
+            
+            # Store user ID for file upload tracking
+            user_data.session(query.from_user.id)['awaiting_excel'] = True
+            
+            await edit_message(query, UPLOAD_EXCEL_TEXT, parse_mode='Markdown', reply_markup=UPLOAD_EXCEL_MARKUP)
+        
+        async def handle_download_template(query, user_type):
+            """Show the Excel template layout"""
+            await edit_message(query, DOWNLOAD_TEMPLATE_TEXT, parse_mode='Markdown', reply_markup=DOWNLOAD_TEMPLATE_MARKUP)
+        
+        async def handle_confirm_delete_all(query, user_type):
+            """Start PIN verification for deleting all medicines"""
+            user_data.session(query.from_user.id)['awaiting_pin'] = True
+            await edit_message(query, CONFIRM_DELETE_PIN_TEXT, parse_mode='Markdown')
+        
+        # Entries take (query, user_type); _CONTEXT_CALLBACK_ROUTES entries take (query, context)
+        _CALLBACK_ROUTES = {
+            **_DISPATCH,
+            "back_to_main": handle_back_to_main,
+            "view_all_medicines": lambda q, ut: handle_view_all_medicines(q),
+            "start_single_add": handle_start_single_add,
+            "upload_excel": handle_upload_excel,
+            "download_template": handle_download_template,
+            "view_text": lambda q, ut: handle_view_text(q),
+            "confirm_delete_all": handle_confirm_delete_all,
+        }
+        _CONTEXT_CALLBACK_ROUTES = {
+            "export_excel": handle_export_excel,
+            "export_medicines": handle_export_excel,
+        }
         
         # PIN VERIFICATION SYSTEM
         
+        class AwaitingFlow(filters.MessageFilter):
+            """Match messages from users with the given user_data flow armed"""
+            
+            def __init__(self, flow):
+                super().__init__(name=f"AwaitingFlow({flow!r})")
+                self.flow = flow
+            
+            def filter(self, message):
+                user = message.from_user
+                return user is not None and user.id in user_data and bool(user_data[user.id].get(self.flow))
+        
         async def handle_pin_verification(update: Update, context):
             """Handle PIN verification for bulk delete"""
             user_id = update.effective_user.id
             
-            # Check if user is in PIN verification state
+            # The handler's filter already checked this; the flow may have been cleared since
             if user_id not in user_data or not user_data[user_id].get('awaiting_pin'):
                 return  # Not waiting for PIN
             
@@ -1919,16 +2112,15 @@ Type the PIN to confirm (or /cancel to abort):
             # Check PIN
             if pin_input == "4321":
                 # Correct PIN - proceed with deletion
-                user_data[user_id]['awaiting_pin'] = False
+                user_data.clear_flow(user_id, 'awaiting_pin')
                 
                 try:
-                    # Get count before deletion
-                    medicines = db.get_all_medicines()
-                    total_deleted = len(medicines)
-                    total_value = sum(med['price'] * med['stock_quantity'] for med in medicines)
+                    # Get count and value before deletion
+                    total_deleted, _, total_value = await asyncio.to_thread(db.get_inventory_summary)
                     
                     # Execute bulk deletion
-                    success = db.delete_all_medicines()
+                    success = await asyncio.to_thread(db.delete_all_medicines)
+                    invalidate_medicines_cache()
                     
                     if success:
                         success_message = f"✅ **ALL MEDICINES DELETED SUCCESSFULLY!**\n\n"
@@ -1939,16 +2131,10 @@ Type the PIN to confirm (or /cancel to abort):
                         success_message += f"🗺️ **Your inventory is now completely empty.**\n\n"
                         success_message += f"🔄 You can start fresh by adding new medicines."
                         
-                        keyboard = [
-                            [InlineKeyboardButton("📝 Add New Medicine", callback_data="add_medicine")],
-                            [InlineKeyboardButton("🏠 Back to Main Menu", callback_data="back_to_main")]
-                        ]
-                        reply_markup = InlineKeyboardMarkup(keyboard)
-                        
                         await update.message.reply_text(
                             success_message,
                             parse_mode='Markdown',
-                            reply_markup=reply_markup
+                            reply_markup=BULK_DELETE_DONE_MARKUP
                         )
                     else:
                         await update.message.reply_text(
@@ -1957,7 +2143,7 @@ Type the PIN to confirm (or /cancel to abort):
                         )
                         
                 except Exception as e:
-                    logger.error(f"Error in bulk deletion: {e}")
+                    logger.error("Error in bulk deletion: %s", e)
                     await update.message.reply_text(
                         f"❌ **Deletion Error**\n\n"
                         f"Error: {str(e)}\n\n"
@@ -1971,18 +2157,12 @@ Type the PIN to confirm (or /cancel to abort):
                     "🛡️ **Bulk deletion has been CANCELLED for security.**\n\n"
                     "If you need to delete all medicines, please try again with the correct PIN."
                 )
-                user_data[user_id]['awaiting_pin'] = False
-            
-            # Clean up user data
-            if user_id in user_data and 'awaiting_pin' in user_data[user_id]:
-                del user_data[user_id]
+                user_data.clear_flow(user_id, 'awaiting_pin')
         
         async def cancel_pin_verification(update: Update, context):
             """Cancel PIN verification"""
             user_id = update.effective_user.id
-            if user_id in user_data:
-                user_data[user_id]['awaiting_pin'] = False
-                del user_data[user_id]
+            user_data.clear_flow(user_id, 'awaiting_pin')
             
             await update.message.reply_text(
                 "❌ **Bulk Delete Cancelled**\n\n"
@@ -1991,10 +2171,20 @@ Type the PIN to confirm (or /cancel to abort):
         
         async def error_handler(update: Update, context):
             """Handle errors"""
-            logger.error(f"Update {update} caused error {context.error}")
+            logger.error("Update %s caused error %s", update, context.error)
+        
+        async def close_connection_pool(application):
+            """Close the pooled user-lookup connections once the bot has stopped"""
+            pool.close_all()
         
         # Create application
-        application = Application.builder().token(BOT_TOKEN).build()
+        builder = Application.builder().token(BOT_TOKEN).concurrent_updates(True).post_shutdown(close_connection_pool)
+        try:
+            # Queue outgoing calls under Telegram's global/group limits and retry after 429s
+            builder = builder.rate_limiter(AIORateLimiter(max_retries=3))
+        except RuntimeError:
+            print("⚠️ Outgoing messages are not rate limited. Install with: pip install \"python-telegram-bot[rate-limiter]\"")
+        application = builder.build()
         
         # Add conversation handler for add medicine
         add_medicine_conv = ConversationHandler(
@@ -2009,17 +2199,23 @@ Type the PIN to confirm (or /cancel to abort):
                 STOCK_QUANTITY: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_stock_quantity)],
             },
             fallbacks=[CommandHandler('cancel', cancel_add_medicine)],
+            # End idle conversations no later than their answers expire from user_data
+            conversation_timeout=USER_DATA_TTL,
         )
         
         # Add handlers
-        application.add_handler(CommandHandler('start', start_command))
+        application.add_handler(CommandHandler('start', start_command, block=False))
         application.add_handler(CommandHandler('medicines', medicines_command))
         application.add_handler(CommandHandler('search', search_command))
         application.add_handler(CommandHandler('cancel', cancel_pin_verification))
         application.add_handler(add_medicine_conv)
-        application.add_handler(CallbackQueryHandler(enhanced_button_handler))
-        application.add_handler(MessageHandler(filters.Document.ALL, handle_document))  # Add document handler
-        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_pin_verification))  # Add PIN verification handler
+        # block=False: PTB schedules each press with application.create_task, and the
+        # handler answers the query before any DB work, so slow presses never stall polling
+        application.add_handler(CallbackQueryHandler(enhanced_button_handler, block=False))
+        # Uploads run in the background the same way, so a long parse never holds up dispatch
+        application.add_handler(MessageHandler(filters.Document.ALL, handle_document, block=False))
+        # Only text from users with a PIN prompt open reaches the PIN handler
+        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND & AwaitingFlow('awaiting_pin'), handle_pin_verification))
         application.add_error_handler(error_handler)
         
         print("✅ Complete bot with buttons configured!")
@@ -2064,7 +2260,7 @@ Type the PIN to confirm (or /cancel to abort):
         
     except Exception as e:
         print(f"❌ Error: {e}")
-        logger.error(f"Bot error: {e}")
+        logger.error("Bot error: %s", e)
         return False
 
 if __name__ == "__main__":
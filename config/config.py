@@ -5,99 +5,170 @@ Handles all environment variables and settings
 """
 
 import os
+import threading
+from dataclasses import MISSING, dataclass, field, fields
 from dotenv import load_dotenv
 from typing import Optional
 
+_dotenv_loaded = False
+_dotenv_lock = threading.Lock()
+
+def _load_dotenv_once():
+    """Parse .env at most once, even if loading is retried or raced from threads"""
+    global _dotenv_loaded
+    if _dotenv_loaded:
+        return
+    with _dotenv_lock:
+        if not _dotenv_loaded:
+            # Only skip .env when the environment already sets every setting;
+            # load_dotenv() never overrides variables that are already set
+            if not all(name in os.environ for name, *_ in _SCHEMA):
+                load_dotenv()
+            _dotenv_loaded = True
+
+def _coerce_int(value: str, default: Optional[int]) -> Optional[int]:
+    """Parse an integer setting, keeping the default for malformed values"""
+    # Check the shape up front so a malformed value costs no ValueError
+    text = value.strip()
+    digits = text[1:] if text[:1] in ('+', '-') else text
+    if not digits.isdecimal():
+        return default
+    return int(text)
+
+# Values that switch a boolean setting on; anything else non-empty switches it off
+_TRUE_VALUES = frozenset({'true', '1', 'yes', 'on'})
+
+def _coerce_bool(value: str, default: bool) -> bool:
+    """Parse a boolean setting, keeping the default for empty values"""
+    return value.lower() in _TRUE_VALUES if value else default
+
+@dataclass(frozen=True)
 class Config:
-    """Configuration manager for the Blue Pharma bot"""
+    """Configuration for the Blue Pharma bot; build it with Config.from_env() or get_config()"""
     
-    def __init__(self):
-        # Load environment variables from .env file
-        load_dotenv()
-        
-        # Telegram Bot Configuration
-        self.BOT_TOKEN = os.getenv('BOT_TOKEN')
-        if not self.BOT_TOKEN:
-            raise ValueError("BOT_TOKEN environment variable is required")
-        
-        # Database Configuration
-        self.DATABASE_PATH = os.getenv('DATABASE_PATH', 'database/bluepharma.db')
-        
-        # Logging Configuration
-        self.LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
-        self.LOG_FILE = os.getenv('LOG_FILE', 'logs/bot.log')
-        
-        # Business Information
-        self.BUSINESS_NAME = os.getenv('BUSINESS_NAME', 'Blue Pharma Trading PLC')
-        self.CONTACT_PHONE = os.getenv('CONTACT_PHONE', '+1-234-567-8900')
-        self.CONTACT_EMAIL = os.getenv('CONTACT_EMAIL', 'info@bluepharma.com')
-        self.BUSINESS_HOURS = os.getenv('BUSINESS_HOURS', 
-            'Monday-Friday: 9:00 AM - 6:00 PM, Saturday: 9:00 AM - 2:00 PM')
-        self.ADDRESS = os.getenv('ADDRESS', 
-            '123 Pharmacy Street, Medical District, City, State 12345')
-        
-        # Security Settings
-        self.ADMIN_TELEGRAM_ID = self._get_int_env('ADMIN_TELEGRAM_ID')
-        self.MAX_ORDER_QUANTITY = self._get_int_env('MAX_ORDER_QUANTITY', 1000)
-        self.RATE_LIMIT_MESSAGES = self._get_int_env('RATE_LIMIT_MESSAGES', 30)
-        self.RATE_LIMIT_WINDOW = self._get_int_env('RATE_LIMIT_WINDOW', 60)
-        
-        # Payment Settings (Optional)
-        self.PAYMENT_PROVIDER = os.getenv('PAYMENT_PROVIDER', 'stripe')
-        self.PAYMENT_TOKEN = os.getenv('PAYMENT_TOKEN')
-        
-        # Notification Settings
-        self.ENABLE_NOTIFICATIONS = self._get_bool_env('ENABLE_NOTIFICATIONS', True)
-        self.NOTIFICATION_CHAT_ID = self._get_int_env('NOTIFICATION_CHAT_ID')
-        
-        # Development Settings
-        self.DEBUG_MODE = self._get_bool_env('DEBUG_MODE', False)
-        self.WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+    # Telegram Bot Configuration
+    # Secrets are left out of repr() so logging the config cannot leak them
+    BOT_TOKEN: str = field(repr=False)
     
-    def _get_int_env(self, key: str, default: Optional[int] = None) -> Optional[int]:
-        """Get integer environment variable"""
-        value = os.getenv(key)
-        if value is None:
-            return default
-        try:
-            return int(value)
-        except ValueError:
-            return default
+    # Database Configuration
+    DATABASE_PATH: str = 'database/bluepharma.db'
+    
+    # Logging Configuration
+    LOG_LEVEL: str = 'INFO'
+    LOG_FILE: str = 'logs/bot.log'
+    
+    # Business Information
+    BUSINESS_NAME: str = 'Blue Pharma Trading PLC'
+    CONTACT_PHONE: str = '+1-234-567-8900'
+    CONTACT_EMAIL: str = 'info@bluepharma.com'
+    BUSINESS_HOURS: str = 'Monday-Friday: 9:00 AM - 6:00 PM, Saturday: 9:00 AM - 2:00 PM'
+    ADDRESS: str = '123 Pharmacy Street, Medical District, City, State 12345'
+    
+    # Security Settings
+    ADMIN_TELEGRAM_ID: Optional[int] = None
+    MAX_ORDER_QUANTITY: Optional[int] = 1000
+    RATE_LIMIT_MESSAGES: Optional[int] = 30
+    RATE_LIMIT_WINDOW: Optional[int] = 60
+    
+    # Payment Settings (Optional)
+    PAYMENT_PROVIDER: str = 'stripe'
+    PAYMENT_TOKEN: Optional[str] = field(default=None, repr=False)
+    
+    # Notification Settings
+    ENABLE_NOTIFICATIONS: bool = True
+    NOTIFICATION_CHAT_ID: Optional[int] = None
+    
+    # Development Settings
+    DEBUG_MODE: bool = False
+    WEBHOOK_URL: Optional[str] = None
     
-    def _get_bool_env(self, key: str, default: bool = False) -> bool:
-        """Get boolean environment variable"""
-        value = os.getenv(key, '').lower()
-        return value in ('true', '1', 'yes', 'on')
+    @classmethod
+    def from_env(cls) -> 'Config':
+        """Build a Config from the environment"""
+        # Read settings from one snapshot: real environment variables win over the
+        # values compiled by compile_config.py, or over .env (parsed once per process)
+        try:
+            from ._compiled import ENV as compiled_env
+        except ImportError:
+            _load_dotenv_once()
+            env = dict(os.environ)
+        else:
+            env = {**compiled_env, **os.environ}
+        
+        values = {}
+        for name, coerce, default, required in _SCHEMA:
+            value = env.get(name)
+            if not value and required:
+                raise ValueError(f"{name} environment variable is required")
+            if value is None:
+                values[name] = default
+            elif coerce is None:
+                values[name] = value
+            else:
+                values[name] = coerce(value, default)
+        return cls(**values)
     
+    # validate_config() messages (plain class attributes, not dataclass fields)
+    _MSG_MISSING_TOKEN = "❌ BOT_TOKEN is required"
+    _MSG_PLACEHOLDER_TOKEN = "❌ Please update BOT_TOKEN in .env file"
+    _MSG_NO_ADMIN = "⚠️  Warning: ADMIN_TELEGRAM_ID not set. You'll need to add it later for admin functions."
+    _MSG_VALID = "✅ Configuration validated successfully"
+
     def validate_config(self) -> bool:
         """Validate required configuration"""
         if not self.BOT_TOKEN:
-            print("❌ BOT_TOKEN is required")
+            print(self._MSG_MISSING_TOKEN)
             return False
         
         if self.BOT_TOKEN == 'your_bot_token_here':
-            print("❌ Please update BOT_TOKEN in .env file")
+            print(self._MSG_PLACEHOLDER_TOKEN)
             return False
         
         if not self.ADMIN_TELEGRAM_ID:
-            print("⚠️  Warning: ADMIN_TELEGRAM_ID not set. You'll need to add it later for admin functions.")
+            print(self._MSG_NO_ADMIN)
         
-        print("✅ Configuration validated successfully")
+        print(self._MSG_VALID)
         return True
     
     def print_config(self):
         """Print current configuration (without sensitive data)"""
-        print("🔧 Blue Pharma Bot Configuration:")
-        print(f"   Business Name: {self.BUSINESS_NAME}")
-        print(f"   Database Path: {self.DATABASE_PATH}")
-        print(f"   Log Level: {self.LOG_LEVEL}")
-        print(f"   Log File: {self.LOG_FILE}")
-        print(f"   Contact Phone: {self.CONTACT_PHONE}")
-        print(f"   Contact Email: {self.CONTACT_EMAIL}")
-        print(f"   Max Order Quantity: {self.MAX_ORDER_QUANTITY}")
-        print(f"   Rate Limit: {self.RATE_LIMIT_MESSAGES} msgs/{self.RATE_LIMIT_WINDOW}s")
-        print(f"   Debug Mode: {self.DEBUG_MODE}")
-        print(f"   Bot Token: {'✅ Set' if self.BOT_TOKEN else '❌ Missing'}")
+        print(
+            "🔧 Blue Pharma Bot Configuration:\n"
+            f"   Business Name: {self.BUSINESS_NAME}\n"
+            f"   Database Path: {self.DATABASE_PATH}\n"
+            f"   Log Level: {self.LOG_LEVEL}\n"
+            f"   Log File: {self.LOG_FILE}\n"
+            f"   Contact Phone: {self.CONTACT_PHONE}\n"
+            f"   Contact Email: {self.CONTACT_EMAIL}\n"
+            f"   Max Order Quantity: {self.MAX_ORDER_QUANTITY}\n"
+            f"   Rate Limit: {self.RATE_LIMIT_MESSAGES} msgs/{self.RATE_LIMIT_WINDOW}s\n"
+            f"   Debug Mode: {self.DEBUG_MODE}\n"
+            f"   Bot Token: {'✅ Set' if self.BOT_TOKEN else '❌ Missing'}"
+        )
+
+# Coercion per field type; str fields are used as read
+_COERCERS = {Optional[int]: _coerce_int, bool: _coerce_bool}
+
+# (name, coercer, default, required) for every Config field, in declaration order
+_SCHEMA = tuple(
+    (f.name, _COERCERS.get(f.type), None if f.default is MISSING else f.default, f.default is MISSING)
+    for f in fields(Config)
+)
+
+_instance: Optional[Config] = None
+_instance_lock = threading.Lock()
+
+def get_config() -> Config:
+    """Return the process-wide Config, loading it on first use"""
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = Config.from_env()
+    return _instance
 
-# Create global config instance
-config = Config()
+def __getattr__(name):
+    """Build the global config instance on first access (``from config.config import config``)"""
+    if name == 'config':
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -7,12 +7,78 @@ Enhanced database operations for the new streamlined bot
 import sqlite3
 import json
 import logging
+import queue
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, NamedTuple, Optional, Tuple, Any
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+class MedicineRecord(NamedTuple):
+    """A parsed medicine row, in the column order add_medicines_bulk inserts it"""
+    name: str
+    batch_number: Optional[str]
+    manufacturing_date: Optional[str]
+    expiring_date: Optional[str]
+    dosage_form: Optional[str]
+    price: float
+    stock_quantity: int
+
+class ConnectionPool:
+    """Bounded pool of long-lived SQLite connections in WAL mode.
+    
+    Readers borrow one of ``size`` shared connections; all writes go through a
+    single dedicated connection guarded by a lock, matching SQLite's
+    single-writer model.
+    """
+    
+    def __init__(self, db_path: str, size: int = 8):
+        self.db_path = db_path
+        self._readers = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._readers.put(self._connect())
+        self._writer = self._connect()
+        self._write_lock = threading.Lock()
+        logger.info("ConnectionPool initialized with %d readers for: %s", size, db_path)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a pooled connection tuned for concurrent access"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA busy_timeout = 5000")
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        """Borrow a reader connection, returning it to the pool afterwards"""
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+    
+    @contextmanager
+    def write_connection(self):
+        """Use the dedicated writer connection; commits on success, rolls back on error"""
+        with self._write_lock:
+            try:
+                yield self._writer
+                self._writer.commit()
+            except Exception:
+                self._writer.rollback()
+                raise
+    
+    def close_all(self):
+        """Close every pooled connection"""
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+        self._writer.close()
+
 class DatabaseManager:
     """Enhanced Database Manager for 2-Tier Blue Pharma Bot"""
     
@@ -27,6 +93,7 @@ class DatabaseManager:
         conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row  # Enable column access by name
         conn.execute("PRAGMA foreign_keys = ON")  # Enable foreign keys
+        conn.execute("PRAGMA synchronous = NORMAL")  # Safe with WAL; skips an fsync per commit
         return conn
     
     def initialize_database(self) -> bool:
@@ -42,6 +109,8 @@ class DatabaseManager:
                 cursor = conn.cursor()
                 cursor.executescript(schema_sql)
                 conn.commit()
+                # After the schema so its auto_vacuum setting applies to a fresh file
+                conn.execute("PRAGMA journal_mode = WAL")  # Persistent; readers don't block the writer
                 conn.close()
                 
                 logger.info("Database schema initialized successfully")
@@ -410,7 +479,43 @@ class DatabaseManager:
             return None
         finally:
             conn.close()
-    
+
+    _BULK_INSERT_MEDICINE = """
+        INSERT INTO medicines (name, batch_number, manufacturing_date, expiring_date,
+                             dosage_form, price, stock_quantity)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """
+
+    def add_medicines_bulk(self, medicines: List[MedicineRecord]) -> int:
+        """Add many medicines in a single transaction; returns the number added (0 on failure)"""
+        conn = self.get_connection()
+
+        try:
+            try:
+                with conn:
+                    conn.executemany(self._BULK_INSERT_MEDICINE, medicines)
+                added = len(medicines)
+            except sqlite3.IntegrityError as e:
+                # One bad row rolled back the batch; keep the good rows, still in one transaction
+                logger.warning(f"Bulk insert rejected a row ({e}), inserting row by row")
+                added = 0
+                with conn:
+                    for medicine in medicines:
+                        try:
+                            conn.execute(self._BULK_INSERT_MEDICINE, medicine)
+                            added += 1
+                        except sqlite3.IntegrityError:
+                            pass
+
+            logger.info(f"Bulk added {added} medicines")
+            return added
+
+        except sqlite3.Error as e:
+            logger.error(f"Error bulk adding medicines: {e}")
+            return 0
+        finally:
+            conn.close()
+
     def get_medicine(self, medicine_id: int) -> Optional[Dict]:
         """Get medicine by ID"""
         conn = self.get_connection()
@@ -472,6 +577,34 @@ class DatabaseManager:
         finally:
             conn.close()
     
+    def get_medicines_page(self, after_id: int = 0, limit: int = 15) -> List[Dict]:
+        """Get the next page of active medicines in name order, starting after medicine after_id.
+        
+        Pages are keyed on (name, id) rather than OFFSET, so later pages cost the same as
+        the first; after_id = 0 returns the first page.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                SELECT id, name, batch_number, manufacturing_date, expiring_date,
+                       dosage_form, price, stock_quantity
+                FROM medicines
+                WHERE is_active = 1
+                  AND (name, id) > (COALESCE((SELECT name FROM medicines WHERE id = ?), ''), ?)
+                ORDER BY name ASC, id ASC
+                LIMIT ?
+            """, (after_id, after_id, limit))
+            
+            return [dict(row) for row in cursor.fetchall()]
+            
+        except sqlite3.Error as e:
+            logger.error(f"Error getting medicines page: {e}")
+            return []
+        finally:
+            conn.close()
+    
     def update_medicine_stock(self, medicine_id: int, new_stock: int, user_id: int = None) -> bool:
         """Update medicine stock (new 6-field structure)"""
         conn = self.get_connection()
@@ -1214,7 +1347,104 @@ class DatabaseManager:
             return []
         finally:
             conn.close()
-    
+
+    def get_medicine_stats(self, top_forms: int = 5) -> Dict:
+        """Get inventory totals and the most common dosage forms"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                SELECT COUNT(*) AS total_medicines,
+                       COALESCE(SUM(stock_quantity), 0) AS total_stock,
+                       COALESCE(SUM(price * stock_quantity), 0) AS total_value,
+                       COALESCE(AVG(price), 0) AS avg_price
+                FROM medicines WHERE is_active = 1
+            """)
+            stats = dict(cursor.fetchone())
+
+            # Ties keep the order of first appearance in the name-sorted list
+            cursor.execute("""
+                SELECT COALESCE(NULLIF(dosage_form, ''), 'Unknown') AS form, COUNT(*) AS count
+                FROM medicines WHERE is_active = 1
+                GROUP BY form
+                ORDER BY count DESC, MIN(name) ASC
+                LIMIT ?
+            """, (top_forms,))
+            stats['top_dosage_forms'] = [(row['form'], row['count']) for row in cursor.fetchall()]
+
+            return stats
+
+        except sqlite3.Error as e:
+            logger.error(f"Error getting medicine stats: {e}")
+            return {}
+        finally:
+            conn.close()
+
+    def get_stock_overview(self, low_stock_threshold: int = 10) -> Tuple[int, int, int, int]:
+        """Get (total medicines, total stock units, low stock, out of stock) counts"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                SELECT COUNT(*),
+                       COALESCE(SUM(stock_quantity), 0),
+                       COALESCE(SUM(CASE WHEN stock_quantity <= ? THEN 1 ELSE 0 END), 0),
+                       COALESCE(SUM(CASE WHEN stock_quantity = 0 THEN 1 ELSE 0 END), 0)
+                FROM medicines WHERE is_active = 1
+            """, (low_stock_threshold,))
+
+            return tuple(cursor.fetchone())
+
+        except sqlite3.Error as e:
+            logger.error(f"Error getting stock overview: {e}")
+            return (0, 0, 0, 0)
+        finally:
+            conn.close()
+
+    def get_inventory_summary(self) -> Tuple[int, int, float]:
+        """Get (total medicines, total stock units, total inventory value)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                SELECT COUNT(*),
+                       COALESCE(SUM(stock_quantity), 0),
+                       COALESCE(SUM(price * stock_quantity), 0)
+                FROM medicines WHERE is_active = 1
+            """)
+
+            return tuple(cursor.fetchone())
+
+        except sqlite3.Error as e:
+            logger.error(f"Error getting inventory summary: {e}")
+            return (0, 0, 0)
+        finally:
+            conn.close()
+
+    def get_low_stock_items(self, threshold: int = 10, limit: int = None) -> List[Dict]:
+        """Get active medicines at or below the stock threshold, lowest stock first"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                SELECT name, stock_quantity, price FROM medicines
+                WHERE is_active = 1 AND stock_quantity <= ?
+                ORDER BY stock_quantity ASC, name ASC
+                LIMIT ?
+            """, (threshold, limit if limit is not None else -1))
+
+            return [dict(row) for row in cursor.fetchall()]
+
+        except sqlite3.Error as e:
+            logger.error(f"Error getting low stock items: {e}")
+            return []
+        finally:
+            conn.close()
+
     
     def delete_medicine(self, medicine_id: int, user_id: int = None) -> bool:
         """Delete a single medicine (soft delete)"""
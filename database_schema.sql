@@ -2,6 +2,9 @@
 -- Two-tier user system: Customers and Staff/Admin
 -- Includes shopping cart and multi-order functionality
 
+-- Reclaim freed pages incrementally (must be set before the first table is created)
+PRAGMA auto_vacuum = INCREMENTAL;
+
 -- Users Table (2-tier system)
 CREATE TABLE IF NOT EXISTS users (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -266,11 +269,15 @@ CREATE TABLE IF NOT EXISTS weekly_sales_summary (
 );
 
 -- Database Indexes for Performance
+-- users.telegram_id is UNIQUE, so the user lookup by telegram_id (AND is_active = 1)
+-- is already served by its automatic index; a partial index on it would go unused.
 CREATE INDEX IF NOT EXISTS idx_users_telegram_id ON users(telegram_id);
 CREATE INDEX IF NOT EXISTS idx_users_type ON users(user_type);
 CREATE INDEX IF NOT EXISTS idx_medicines_active ON medicines(is_active);
 CREATE INDEX IF NOT EXISTS idx_medicines_name ON medicines(name);
 CREATE INDEX IF NOT EXISTS idx_medicines_category ON medicines(therapeutic_category);
+CREATE INDEX IF NOT EXISTS idx_med_cat_name_covering ON medicines(therapeutic_category, name, price, stock_quantity) WHERE is_active = 1;
+CREATE INDEX IF NOT EXISTS idx_medicines_stock ON medicines(stock_quantity);
 CREATE INDEX IF NOT EXISTS idx_shopping_cart_user ON shopping_cart(user_id);
 CREATE INDEX IF NOT EXISTS idx_orders_user ON orders(user_id);
 CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status);